@@ -197,21 +197,27 @@ def guess_format(filename, formats, args=None):
   'sdat'
   >>> guess_format('../subjects.sdat.gz:format=ldat', f)
   'ldat'
+  >>> guess_format('../my.subjects.sdat.gz', f)
+  'sdat'
+  >>> guess_format('subjects.txt', f)
   '''
 
   if not is_str(filename):
     return None
 
-  # Parse to remove augmented arguments
-  if args is None:
-    args = {}
+  # Parse to remove augmented arguments, which requires checking for the
+  # existence of the file only if the name could carry them
+  if ':' in filename:
+    if args is None:
+      args = {}
 
-  filename = parse_augmented_filename(filename,args)
+    filename = parse_augmented_filename(filename,args)
 
-  if 'format' in args:
+  if args and 'format' in args:
     return args['format']
 
-  parts = os.path.basename(filename).split('.')
+  # Only the format and compression suffixes are needed
+  parts = os.path.basename(filename).rsplit('.',2)
 
   if len(parts)>1 and parts[-1] in COMPRESSED_SUFFIXES:
     parts.pop()
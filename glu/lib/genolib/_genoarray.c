@@ -1137,6 +1137,19 @@ genomodel_replaceable_by_py(UnphasedMarkerModelObject *self, UnphasedMarkerModel
 		return NULL;
 }
 
+/* Return the number of bits required to store m distinct values, i.e.
+   ceil(log2(m)), computed exactly in integer arithmetic */
+static inline unsigned short
+genotype_bit_size(unsigned long m)
+{
+	unsigned short bits = 0;
+
+	for(m = m ? m-1 : 0; m; m >>= 1)
+		bits++;
+
+	return bits;
+}
+
 static int
 genomodel_init(UnphasedMarkerModelObject *self, PyObject *args, PyObject *kw)
 {
@@ -1167,9 +1180,9 @@ genomodel_init(UnphasedMarkerModelObject *self, PyObject *args, PyObject *kw)
 		goto error;
 
 	if(self->allow_hemizygote)
-		self->bit_size = ceil(log2((n+1)*(n+2)/2));
+		self->bit_size = genotype_bit_size((n+1)*(n+2)/2);
 	else
-		self->bit_size = ceil(log2(n*(n+1)/2 + 1));
+		self->bit_size = genotype_bit_size(n*(n+1)/2 + 1);
 
 	/* Build missing allele and genotype */
 	missing = PyTuple_Pack(2, Py_None, Py_None);
@@ -1187,9 +1200,37 @@ error:
 	return -1;
 }
 
+/* model[i] returns the i'th genotype for integer i, otherwise model[geno]
+   is equivalent to model.get_genotype(geno) */
+static PyObject *
+genomodel_subscript(UnphasedMarkerModelObject *self, PyObject *item)
+{
+	if(PyIndex_Check(item))
+	{
+		Py_ssize_t n, i = PyNumber_AsSsize_t(item, PyExc_IndexError);
+		if(i == -1 && PyErr_Occurred())
+			return NULL;
+
+		n = PyList_GET_SIZE(self->genotypes);
+		if(i < 0)
+			i += n;
+		if(i < 0 || i >= n)
+		{
+			PyErr_SetString(PyExc_IndexError, "genotype index out of range");
+			return NULL;
+		}
+
+		item = PyList_GET_ITEM(self->genotypes, i);
+		Py_INCREF(item);
+		return item;
+	}
+
+	return genomodel_get_genotype(self, item);
+}
+
 static PyMappingMethods genomodel_as_mapping = {
 	(lenfunc)0,
-	(binaryfunc)genomodel_get_genotype,
+	(binaryfunc)genomodel_subscript,
 	(objobjargproc)0,
 };
 
@@ -1383,7 +1424,13 @@ genoarray_new(PyTypeObject *type, PyObject *args, PyObject *kw)
 	self->descriptor = descriptor;
 	Py_INCREF(self->descriptor);
 
-	if( genos && genos!=Py_None )
+	/* FASTPATH: copy the packed data of arrays sharing our descriptor */
+	if( genos && GenotypeArray_Check(genos)
+	          && ((GenotypeArrayObject *)genos)->descriptor == descriptor )
+	{
+		memcpy(self->data, ((GenotypeArrayObject *)genos)->data, n);
+	}
+	else if( genos && genos!=Py_None )
 	{
 		if( PySequence_SetSlice( (PyObject *)self, 0, genoarray_length(self), genos) == -1)
 		{
@@ -2222,11 +2269,75 @@ static int category_foreach(Py_ssize_t i, GenotypeObject *geno, void *state)
 	return 0;
 }
 
+/* Tally genotype categories of a GenotypeArray whose genotypes are all of
+   a single model and packed in homogeneous 2, 4, or 8 bit fields from offset
+   zero.  Rather than visit each genotype object, a histogram of whole data
+   bytes is accumulated and then apportioned to the genotype index of each
+   field within a byte.  Returns 1 if the counts were updated, 0 if the fast
+   path does not apply, and -1 on error. */
+static int
+genoarray_categories_packed(GenotypeArrayObject *genos, unsigned long *counts)
+{
+	UnphasedMarkerModelObject *model;
+	GenotypeObject *geno;
+	const unsigned int *offsets;
+	const unsigned char *data;
+	Py_ssize_t bytecounts[256];
+	Py_ssize_t indexcounts[256];
+	Py_ssize_t len, i, j, k, width, fields, nbytes;
+	unsigned int mask;
+
+	width   = genos->descriptor->homogeneous;
+	offsets = (const unsigned int *)PyArray_DATA(genos->descriptor->offsets);
+
+	if( (width != 2 && width != 4 && width != 8) || offsets[0] != 0 )
+		return 0;
+
+	len = descr_length(genos->descriptor);
+	if(len <= 0) return len;
+
+	model = (UnphasedMarkerModelObject *)PyList_GET_ITEM(genos->descriptor->models, 0);
+	for(i = 1; i < len; ++i)
+		if( PyList_GET_ITEM(genos->descriptor->models, i) != (PyObject *)model )
+			return 0;
+
+	fields = 8/width;
+	mask   = (1<<width)-1;
+	nbytes = len/fields;
+	data   = genos->data;
+
+	memset(bytecounts,  0, sizeof(bytecounts));
+	memset(indexcounts, 0, sizeof(indexcounts));
+
+	for(i = 0; i < nbytes; ++i)
+		bytecounts[data[i]] += 1;
+
+	for(i = 0; i < 256; ++i)
+		if(bytecounts[i])
+			for(k = 8-width; k >= 0; k -= width)
+				indexcounts[(i>>k)&mask] += bytecounts[i];
+
+	/* Remaining fields in a partial final byte */
+	for(j = nbytes*fields, k = 8-width; j < len; ++j, k -= width)
+		indexcounts[(data[nbytes]>>k)&mask] += 1;
+
+	for(i = 0; i <= mask; ++i)
+	{
+		if(!indexcounts[i]) continue;
+
+		geno = (GenotypeObject *)PyList_GetItem(model->genotypes, i); /* borrowed ref */
+		if(!geno) return -1;
+
+		counts[ genotype_category(geno) ] += indexcounts[i];
+	}
+	return 1;
+}
+
 static PyObject *
 genotype_categories(PyObject *genos, PyObject *count_array)
 {
 	npy_intp count_len=4;
-	int len;
+	int len, ret;
 
 	if(count_array==Py_None) count_array=NULL;
 
@@ -2249,12 +2360,26 @@ genotype_categories(PyObject *genos, PyObject *count_array)
 		PyArray_FILLWBYTE(count_array, 0);
 	}
 
-	if(for_each_genotype(genos, category_foreach, PyArray_DATA(count_array)) < 0)
+	/* Fast path: histogram packed bytes of single-model genotype arrays */
+	if(GenotypeArray_Check(genos))
 	{
-		Py_DECREF(count_array);
-		return NULL;
+		if( genoarray_checkstate((GenotypeArrayObject *)genos) == -1 )
+			goto error;
+
+		ret = genoarray_categories_packed((GenotypeArrayObject *)genos,
+		                                  (unsigned long *)PyArray_DATA(count_array));
+		if(ret == -1) goto error;
+		if(ret ==  1) return count_array;
 	}
+
+	if(for_each_genotype(genos, category_foreach, PyArray_DATA(count_array)) < 0)
+		goto error;
+
 	return count_array;
+
+error:
+	Py_DECREF(count_array);
+	return NULL;
 }
 
 static PyObject *
@@ -17,9 +17,75 @@ See GLU license for terms by running: glu license
 
 #include <Python.h>
 #include <math.h>
+#include <string.h>
 #include "_genoarray.h"
 
 
+/* Low bit of each 2-bit and 4-bit field within a 64-bit word */
+#define FIELDS2_LOW 0x5555555555555555ULL
+#define FIELDS4_LOW 0x1111111111111111ULL
+
+static inline Py_ssize_t
+popcount64(npy_uint64 x)
+{
+#if defined(__GNUC__)
+	return __builtin_popcountll(x);
+#else
+	x = x - ((x >> 1) & 0x5555555555555555ULL);
+	x = (x & 0x3333333333333333ULL) + ((x >> 2) & 0x3333333333333333ULL);
+	x = (x + (x >> 4)) & 0x0F0F0F0F0F0F0F0FULL;
+	return (Py_ssize_t)((x * 0x0101010101010101ULL) >> 56);
+#endif
+}
+
+/* Count concordant and informative 2-bit fields over nwords 64-bit words of
+   packed genotypes.  A field is informative if it is non-zero in both
+   inputs and concordant if it is also identical.  Each field is folded onto
+   its low bit so that both tests reduce to a mask and a popcount. */
+static inline void
+concordance_words_2bit(const unsigned char *g1, const unsigned char *g2, Py_ssize_t nwords,
+                       Py_ssize_t *concordant, Py_ssize_t *comparisons)
+{
+	Py_ssize_t i;
+	npy_uint64 a, b, x, informative, discordant;
+
+	for(i = 0; i < nwords; ++i)
+	{
+		memcpy(&a, g1+8*i, 8);
+		memcpy(&b, g2+8*i, 8);
+
+		x           = a^b;
+		informative = (a|(a>>1)) & (b|(b>>1)) & FIELDS2_LOW;
+		discordant  = (x|(x>>1)) & FIELDS2_LOW;
+
+		*comparisons += popcount64(informative);
+		*concordant  += popcount64(informative & ~discordant);
+	}
+}
+
+/* 4-bit analog of concordance_words_2bit */
+static inline void
+concordance_words_4bit(const unsigned char *g1, const unsigned char *g2, Py_ssize_t nwords,
+                       Py_ssize_t *concordant, Py_ssize_t *comparisons)
+{
+	Py_ssize_t i;
+	npy_uint64 a, b, x, informative, discordant;
+
+	for(i = 0; i < nwords; ++i)
+	{
+		memcpy(&a, g1+8*i, 8);
+		memcpy(&b, g2+8*i, 8);
+
+		x           = a^b;
+		informative = (a|(a>>1)|(a>>2)|(a>>3)) & (b|(b>>1)|(b>>2)|(b>>3)) & FIELDS4_LOW;
+		discordant  = (x|(x>>1)|(x>>2)|(x>>3)) & FIELDS4_LOW;
+
+		*comparisons += popcount64(informative);
+		*concordant  += popcount64(informative & ~discordant);
+	}
+}
+
+
 PyObject *
 genoarray_concordance_8bit(PyObject *self, PyObject *args)
 {
@@ -135,7 +201,11 @@ genoarray_concordance_4bit(PyObject *self, PyObject *args)
 	g2 = genos2->data;
 
 	concordant = comparisons = 0;
-	for(i = 0; i < len/2; ++i)
+
+	/* Process whole 64-bit words of 16 genotypes, then any remaining bytes */
+	concordance_words_4bit(g1, g2, len/16, &concordant, &comparisons);
+
+	for(i = (len/16)*8; i < len/2; ++i)
 	{
 		const unsigned char a  = g1[i];
 		const unsigned char b  = g2[i];
@@ -226,7 +296,11 @@ genoarray_concordance_2bit(PyObject *self, PyObject *args)
 	g2 = genos2->data;
 
 	concordant = comparisons = 0;
-	for(i = 0; i < len/4; ++i)
+
+	/* Process whole 64-bit words of 32 genotypes, then any remaining bytes */
+	concordance_words_2bit(g1, g2, len/32, &concordant, &comparisons);
+
+	for(i = (len/32)*8; i < len/4; ++i)
 	{
 		const unsigned char a  = g1[i];
 		const unsigned char b  = g2[i];
@@ -18,7 +18,33 @@ from   glu.lib.utils             import is_str
 from   glu.lib.genolib.locus     import Genome
 from   glu.lib.genolib.genoarray import GenotypeArrayDescriptor,GenotypeArray,            \
                                         GenotypeLookupError, GenotypeRepresentationError, \
-                                        build_model, build_descr
+                                        build_model, build_descr, make_str_lut,         \
+                                        genoarray_from_strings, GENO_ARRAY_VERSION
+
+
+# The pure-Python genotype array packs genotype strings much faster by table
+# lookup than by assigning genotype objects one at a time, while the C
+# implementation is fastest when given genotype objects directly
+PACK_STRINGS = GENO_ARRAY_VERSION == 'Python'
+
+
+def _string_luts(lutmap,model,missing):
+  '''
+  Return cached genotype string lookup tables for model, rebuilding them
+  when genotypes have been added to the model since they were built.
+  Models that cannot be represented by single character alleles map to
+  None.
+  '''
+  n,luts = lutmap.get(model,(None,None))
+
+  if n != len(model.genotypes):
+    try:
+      luts = make_str_lut(model,missing)
+    except GenotypeRepresentationError:
+      luts = None
+    lutmap[model] = len(model.genotypes),luts
+
+  return luts
 
 
 def _sample_encoding_error(loci,models,genos,warn=False):
@@ -688,7 +714,15 @@ def encode_genomatrixstream_from_strings(columns,genos,format,genorepr,genome=No
       n = len(columns)
 
       cachemap     = {}
+      lutmap       = {}
       from_strings = genorepr.from_strings
+      missing      = ''.join(a for a in genorepr.missing_allele_strs if len(a)==1)
+
+      def pack_row(model,descr,row,cache):
+        luts = _string_luts(lutmap,model,missing) if PACK_STRINGS else None
+        if luts is not None:
+          return genoarray_from_strings(descr,row,genorepr,luts)
+        return GenotypeArray(descr,imap(getitem, repeat(cache), row))
 
       for lname,row in genos:
         loc   = genome.get_locus(lname)
@@ -698,13 +732,13 @@ def encode_genomatrixstream_from_strings(columns,genos,format,genorepr,genome=No
         if loc.model is not None and cache is not None:
           try:
             descr = build_descr(loc.model,n)
-            row   = GenotypeArray(descr,imap(getitem, repeat(cache), row))
+            row   = pack_row(loc.model,descr,row,cache)
 
             models.append(loc.model)
             yield lname,row
             continue
 
-          except (GenotypeLookupError,KeyError):
+          except (GenotypeLookupError,GenotypeRepresentationError,KeyError):
             pass
 
         # SLOW PATH: no model, new alleles, no string cache, or new representation
@@ -726,7 +760,7 @@ def encode_genomatrixstream_from_strings(columns,genos,format,genorepr,genome=No
         cache.update( (gs,loc.model[gt]) for gs,gt in izip(gstrs,gtups) )
 
         descr = build_descr(loc.model,n)
-        row   = GenotypeArray(descr,imap(getitem, repeat(cache), row))
+        row   = pack_row(loc.model,descr,row,cache)
 
         models.append(loc.model)
         yield lname,row
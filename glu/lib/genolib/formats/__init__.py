@@ -10,6 +10,9 @@ __all__       = ['guess_informat','guess_informat_list','guess_outformat',
                  'genostream_preferred_format']
 
 
+import os
+
+from   glu.lib.utils     import is_str
 from   glu.lib.fileutils import guess_format
 
 
@@ -23,6 +26,14 @@ SAVERS       = {}
 WRITERS      = {}
 PREF_FORMATS = {}
 
+# (magic prefix, format) pairs used to sniff input files with unknown names
+MAGIC_FORMATS = []
+
+# Formats guessed from input file names, bounded to INFORMAT_CACHE_SIZE entries.
+# Only name-based results are cached, since file contents may change.
+INFORMAT_CACHE      = {}
+INFORMAT_CACHE_SIZE = 1024
+
 
 ########################################################################################################
 # Public API
@@ -30,17 +41,83 @@ def guess_informat(filename):
   '''
   @param filename: a file name or file object
   @type  filename: str or file object
+
+  >>> guess_informat('/nonexistent/file.unknown')
+  >>> '/nonexistent/file.unknown' in INFORMAT_CACHE
+  False
+  '''
+  if not is_str(filename):
+    return guess_format(filename, INPUT_EXTS)
+
+  try:
+    return INFORMAT_CACHE[filename]
+  except KeyError:
+    pass
+
+  format = guess_format(filename, INPUT_EXTS)
+
+  # Files with unrecognized names are sniffed on every call, as they may be
+  # created or rewritten later
+  if not format:
+    return guess_magic_format(filename)
+
+  if len(INFORMAT_CACHE) >= INFORMAT_CACHE_SIZE:
+    INFORMAT_CACHE.clear()
+
+  INFORMAT_CACHE[filename] = format
+  return format
+
+
+def guess_magic_format(filename):
   '''
-  return guess_format(filename, INPUT_EXTS)
+  Guess the format of an existing input file from its leading bytes.  Only
+  formats that register a magic prefix via __genomagic__ can be detected.
+
+  @param filename: a file name
+  @type  filename: str
+  @return        : format name or None
+  @rtype         : str or None
+
+  >>> guess_magic_format('/nonexistent/file')
+  '''
+  if not MAGIC_FORMATS or not is_str(filename) or not os.path.isfile(filename):
+    return None
+
+  size = max(len(magic) for magic,format in MAGIC_FORMATS)
+
+  try:
+    with open(filename,'rb') as f:
+      header = f.read(size)
+  except IOError:
+    return None
+
+  for magic,format in MAGIC_FORMATS:
+    if header.startswith(magic):
+      return format
+
+  return None
 
 
 def guess_informat_list(filenames):
   '''
   @param filename: a file name or file object
   @type  filename: str or file object
+
+  >>> guess_informat_list(['a.ldat','b.ldat.gz',None])
+  'ldat'
+  >>> guess_informat_list(['a.ldat','b.sdat','c.ldat'])
+  >>> guess_informat_list([])
   '''
-  formats = set( guess_informat(f) for f in filenames )
-  formats.discard(None)
+  formats = set()
+  for f in filenames:
+    format = guess_informat(f)
+    if format is not None:
+      formats.add(format)
+
+      # Stop as soon as the formats are known to be mixed
+      if len(formats) > 1:
+        return None
+
   if len(formats) == 1:
     return formats.pop()
   return None
@@ -106,7 +183,8 @@ def discover_modules():
 
 
 def discover_formats():
-  from   glu.lib.utils import is_str
+  INFORMAT_CACHE.clear()
+  del MAGIC_FORMATS[:]
 
   for name,module in discover_modules():
     formats = module.__genoformats__
@@ -150,5 +228,13 @@ def discover_formats():
             raise ValueError('Conflicting genotype writer for format %s' % name)
           WRITERS[name] = writer
 
+    for magic,format in getattr(module,'__genomagic__',[]):
+      if format not in LOADERS:
+        raise ValueError('No genotype loader for magic format %s' % format)
+      MAGIC_FORMATS.append( (magic,format) )
+
+  # Test longer, more specific prefixes first
+  MAGIC_FORMATS.sort(key=lambda m: -len(m[0]))
+
 
 discover_formats()
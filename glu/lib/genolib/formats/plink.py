@@ -19,6 +19,9 @@ __genoformats__ = [
                                                                    'plink_lbed'],             'bed'),
   ('load_plink_bed', 'save_plink_bed', 'PlinkBedWriter',  'sdat', ['plink_sbed','sbed'],      None ) ]
 
+# PLINK BED files begin with a two byte magic number followed by a mode byte
+__genomagic__ = [ ('\x6c\x1b', 'bed') ]
+
 
 import string
 
@@ -25,6 +25,88 @@ MISSING,HEMIZYGOTE,HOMOZYGOTE,HETEROZYGOTE=range(4)
 FORCE_PYTHON=False
 
 
+# Bit widths whose fields never straddle a byte boundary and may be
+# packed and unpacked a whole array at a time
+PACKED_WIDTHS = (1,2,4,8)
+
+
+def _packed_width(descr):
+  '''
+  Return the homogeneous bit width of descr if its genotypes can be
+  processed by the vectorized bit-packing kernels, otherwise 0.
+  '''
+  width = descr.homogeneous
+  if width in PACKED_WIDTHS and not descr.offsets[0]%8:
+    return width
+  return 0
+
+
+def unpack_genotype_indices(data, startbit, n, width):
+  '''
+  Unpack n consecutive width-bit genotype indices from data beginning at
+  bit startbit.  Fields are stored most significant bit first, as written
+  by setbits, and width must be one of PACKED_WIDTHS.
+
+  @param     data: bit-packed genotype data
+  @type      data: np.ndarray of np.uint8
+  @param startbit: bit index of the first field, a multiple of width
+  @type  startbit: int
+  @param        n: number of fields to unpack
+  @type         n: int
+  @param    width: bit width of each field
+  @type     width: int
+  @return        : genotype indices
+  @rtype         : np.ndarray of np.uint8
+
+  >>> data = np.array([0x1B,0xE4],dtype=np.uint8)
+  >>> unpack_genotype_indices(data,0,8,2)
+  array([0, 1, 2, 3, 3, 2, 1, 0], dtype=uint8)
+  >>> unpack_genotype_indices(data,4,3,4)
+  array([11, 14,  4], dtype=uint8)
+  '''
+  per         = 8//width
+  first,lead  = divmod(startbit,8)
+  lead      //= width
+  nbytes      = (lead+n+per-1)//per
+  shifts      = np.arange(8-width,-1,-width,dtype=np.uint8)
+  fields      = (data[first:first+nbytes,np.newaxis]>>shifts) & ((1<<width)-1)
+  return fields.ravel()[lead:lead+n]
+
+
+def pack_genotype_indices(data, startbit, indices, width):
+  '''
+  Pack a sequence of width-bit genotype indices into data beginning at bit
+  startbit, preserving all bits outside of the fields written.  width must
+  be one of PACKED_WIDTHS.
+
+  @param     data: bit-packed genotype data
+  @type      data: np.ndarray of np.uint8
+  @param startbit: bit index of the first field, a multiple of width
+  @type  startbit: int
+  @param  indices: genotype indices
+  @type   indices: sequence of int
+  @param    width: bit width of each field
+  @type     width: int
+
+  >>> data = np.zeros(2,dtype=np.uint8)
+  >>> pack_genotype_indices(data,0,[0,1,2,3,3,2,1,0],2)
+  >>> [ hex(b) for b in data ]
+  ['0x1b', '0xe4']
+  >>> pack_genotype_indices(data,4,[15,15],4)
+  >>> [ hex(b) for b in data ]
+  ['0x1f', '0xf4']
+  '''
+  n           = len(indices)
+  per         = 8//width
+  first,lead  = divmod(startbit,8)
+  lead      //= width
+  nbytes      = (lead+n+per-1)//per
+  fields      = unpack_genotype_indices(data,first*8,nbytes*per,width)
+  fields[lead:lead+n] = indices
+  shifts      = np.arange(8-width,-1,-width,dtype=np.uint8)
+  data[first:first+nbytes] = (fields.reshape(-1,per)<<shifts).sum(axis=1)
+
+
 try:
   if FORCE_PYTHON:
     raise ImportError
@@ -43,7 +125,6 @@ except ImportError:
   GENO_ARRAY_VERSION='Python'
 
   import sys
-  from   math      import log, ceil
 
   from   glu.lib.genolib.bitarray  import getbits,setbits
 
@@ -65,7 +146,8 @@ except ImportError:
     possible genotype within a model.
     '''
 
-    __slots__ = ('model','allele1_index','allele2_index','index','category')
+    __slots__ = ('model','allele1_index','allele2_index','index','category','_alleles',
+                 '_nonmissing','_hemi','_hom','_het')
 
     def __init__(self, model, allele1, allele2, index):
       '''
@@ -84,8 +166,9 @@ except ImportError:
       self.model   = model
       self.index   = index
 
-      self.allele1_index = model.alleles.index(allele1)
-      self.allele2_index = model.alleles.index(allele2)
+      self.allele1_index = model.get_allele(allele1)
+      self.allele2_index = model.get_allele(allele2)
+      self._alleles      = (model.alleles[self.allele1_index],model.alleles[self.allele2_index])
 
       missing1 = allele1 is None
       missing2 = allele2 is None
@@ -101,121 +184,117 @@ except ImportError:
           raise GenotypeRepresentationError('Attempt to add non-singleton alleles')
         self.category = HETEROZYGOTE
 
+      # Genotypes are immutable, so category tests are computed only once
+      self._nonmissing = self.category != MISSING
+      self._hemi       = self.category == HEMIZYGOTE
+      self._hom        = self.category == HOMOZYGOTE
+      self._het        = self.category == HETEROZYGOTE
+
     @property
     def allele1(self):
-      return self.model.alleles[self.allele1_index]
+      return self._alleles[0]
 
     @property
     def allele2(self):
-      return self.model.alleles[self.allele2_index]
+      return self._alleles[1]
 
     def alleles(self):
       '''
       Return a tuple of alleles
       '''
-      alleles = self.model.alleles
-      allele1 = alleles[self.allele1_index]
-      allele2 = alleles[self.allele2_index]
-      return (allele1,allele2)
+      return self._alleles
 
     def heterozygote(self):
       '''
       Return whether this genotype is heterozygous
       '''
-      return self.category == HETEROZYGOTE
+      return self._het
 
     def homozygote(self):
       '''
       Return whether this genotype is homozygous
       '''
-      return self.category == HOMOZYGOTE
+      return self._hom
 
     def hemizygote(self):
       '''
       Return whether this genotype is hemizygous
       '''
-      return self.category == HEMIZYGOTE
+      return self._hemi
 
     def missing(self):
       '''
       Return whether this genotype is the missing genotype
       '''
-      return self.category == MISSING
+      return not self._nonmissing
 
     def __nonzero__(self):
       '''
       Return whether this genotype is not the missing genotype
       '''
-      return self.category != MISSING
+      return self._nonmissing
 
     def __getitem__(self,i):
       '''
       Return the i'th allele, for i in [0,1]
       '''
-      return self.alleles()[i]
+      return self._alleles[i]
 
     def __len__(self):
       '''
       Return the number of non-missing alleles
       '''
-      return len([a for a in self.alleles() if a is not None])
+      allele1,allele2 = self._alleles
+      return (allele1 is not None) + (allele2 is not None)
 
     def __repr__(self):
       '''
       Return a string representation of the alleles
       '''
-      return repr(self.alleles())
+      return repr(self._alleles)
 
     def __hash__(self):
-      return hash(self.alleles())
+      return hash(self._alleles)
 
     def __eq__(self,other):
       '''
       Compare this genotype with another genotype or tuple for equality.
 
-      If other is a genotype, then the comparison is by object identity.
-      If other is a tuple, then the comparison is by allele tuple equivalence.
+      If other is a genotype of the same model, then the comparison is by
+      object identity.  Otherwise the comparison is by allele tuple
+      equivalence.
 
       @param other: other genotype
       @type  other: Genotype or tuple
       '''
-      geno_self  = isinstance(self,Genotype)
-      geno_other = isinstance(other,Genotype)
+      if other.__class__ is Genotype and other.model is self.model:
+        return self is other
 
-      if geno_self:
-        self = self.alleles()
-      if geno_other:
-        other = other.alleles()
-
-      if not isinstance(self, tuple) or len(self) !=2 or \
-         not isinstance(other,tuple) or len(other)!=2:
+      other = _genotype_key(other)
+      if other is None:
         return NotImplemented
 
-      return sorted(self)==sorted(other)
+      return self._alleles == other
 
     def __ne__(self,other):
       '''
       Compare this genotype with another genotype or tuple for inequality.
 
-      If other is a genotype, then the comparison is by object identity.
-      If other is a tuple, then the comparison is by allele tuple equivalence.
+      If other is a genotype of the same model, then the comparison is by
+      object identity.  Otherwise the comparison is by allele tuple
+      equivalence.
 
       @param other: other genotype
       @type  other: Genotype or tuple
       '''
-      geno_self  = isinstance(self,Genotype)
-      geno_other = isinstance(other,Genotype)
-
-      if geno_self:
-        self = self.alleles()
-      if geno_other:
-        other = other.alleles()
+      if other.__class__ is Genotype and other.model is self.model:
+        return self is not other
 
-      if not isinstance(self, tuple) or len(self) !=2 or \
-         not isinstance(other,tuple) or len(other)!=2:
+      other = _genotype_key(other)
+      if other is None:
         return NotImplemented
 
-      return sorted(self)!=sorted(other)
+      return self._alleles != other
 
     def __lt__(self,other):
       '''
@@ -225,16 +304,11 @@ except ImportError:
       @param other: other genotype
       @type  other: Genotype or tuple
       '''
-      if isinstance(self,Genotype):
-        self = self.alleles()
-      if isinstance(other,Genotype):
-        other = other.alleles()
-
-      if not isinstance(self, tuple) or len(self) !=2 or \
-         not isinstance(other,tuple) or len(other)!=2:
+      other = _genotype_key(other)
+      if other is None:
         return NotImplemented
 
-      return sorted(self)<sorted(other)
+      return self._alleles < other
 
     def __le__(self,other):
       '''
@@ -244,17 +318,25 @@ except ImportError:
       @param other: other genotype
       @type  other: Genotype or tuple
       '''
-
-      if isinstance(self,Genotype):
-        self = self.alleles()
-      if isinstance(other,Genotype):
-        other = other.alleles()
-
-      if not isinstance(self, tuple) or len(self) !=2 or \
-         not isinstance(other,tuple) or len(other)!=2:
+      other = _genotype_key(other)
+      if other is None:
         return NotImplemented
 
-      return sorted(self)<=sorted(other)
+      return self._alleles <= other
+
+  def _genotype_key(geno):
+    '''
+    Return the ordered allele tuple of a genotype or genotype tuple, or None
+    if geno is neither.  Genotype alleles are stored in order by their model.
+    '''
+    if geno.__class__ is Genotype:
+      return geno._alleles
+    elif isinstance(geno,tuple) and len(geno)==2:
+      allele1,allele2 = geno
+      return (allele2,allele1) if allele2 < allele1 else geno
+    elif isinstance(geno,Genotype):
+      return geno._alleles
+    return None
 
   def genotype_bit_size(n,allow_hemizygote):
     '''
@@ -274,7 +356,7 @@ except ImportError:
     else:
       m = n*(n+1)//2 + 1
 
-    return int(ceil(log(m)/log(2.0)))
+    return (m-1).bit_length()
 
   def byte_array_size(n):
     '''
@@ -285,35 +367,39 @@ except ImportError:
     @return      : byte size
     @rtype       : int
     '''
-    return int(ceil(n/8))
+    return (n+7)>>3
 
 
   class GenotypeArrayDescriptor(object):
-    __slots__ = ('_models','offsets','byte_size','bit_size','max_bit_size','homogeneous')
+    __slots__ = ('_models','offsets','widths','byte_size','bit_size','max_bit_size','homogeneous')
 
     def __init__(self, models, initial_offset=0):
       '''
       Construct a new GenotypeArrayDescriptor
+
+      Bit offsets and widths of each model are stored as parallel arrays so
+      that genotype extraction need not dereference each model.
       '''
       n = len(models)
 
-      homogeneous = models[0].bit_size if models else 0
-
-      offsets = [0]*(n+1)
+      widths  = np.fromiter( (m.bit_size for m in models), dtype=np.uint8, count=n)
 
+      offsets = np.empty(n+1, dtype=np.int64)
       offsets[0] = initial_offset
-      max_bit_size = 0
-      for i,m in enumerate(models):
-        offsets[i+1] = offsets[i] + m.bit_size
-        max_bit_size = max(max_bit_size,m.bit_size)
-        if m.bit_size != homogeneous:
-          homogeneous = 0
+      np.cumsum(widths, dtype=np.int64, out=offsets[1:])
+      offsets[1:] += initial_offset
+
+      if n and widths.min() == widths.max():
+        homogeneous = int(widths[0])
+      else:
+        homogeneous = 0
 
       self._models      = models
       self.offsets      = offsets
-      self.bit_size     = offsets[-1]
+      self.widths       = widths
+      self.bit_size     = int(self.offsets[-1])
       self.byte_size    = byte_array_size(self.bit_size)
-      self.max_bit_size = max_bit_size
+      self.max_bit_size = int(widths.max()) if n else 0
       self.homogeneous  = homogeneous
 
     def __len__(self):
@@ -375,8 +461,73 @@ except ImportError:
       self._models[i] = new_model
 
 
+  def _resolve_genotype(model, geno):
+    '''
+    Return the genotype object belonging to model for a genotype object
+    or tuple
+    '''
+    if isinstance(geno,tuple) and len(geno) == 2:
+      return model[geno]
+    elif not isinstance(geno,Genotype):
+      raise GenotypeRepresentationError('Invalid genotype: %s' % geno)
+    elif geno.model is not model:
+      return model[geno.alleles()]
+    return geno
+
+  def _resolve_index(model, geno):
+    '''
+    Return the index within model of a genotype object or tuple, without
+    retrieving genotype objects for tuples already known to model
+    '''
+    if geno.__class__ is Genotype and geno.model is model:
+      return geno.index
+    elif geno.__class__ is tuple:
+      tuple_to_index = model._tuple_to_index
+      index = tuple_to_index.get(geno)
+      if index is None:
+        index = tuple_to_index.get(_genotype_key(geno))
+      if index is not None:
+        return index
+    return _resolve_genotype(model,geno).index
+
+
+  # Byte alignment of GenotypeArray data buffers
+  DATA_ALIGNMENT = 16
+
+  def _genotype_objects(model):
+    '''
+    Return an object array of the genotypes of model, suitable for gathering
+    genotypes by index.  The array is cached on the model and rebuilt when
+    genotypes have been added since it was last requested.
+    '''
+    genos = model._genotype_objects
+
+    if genos is None or len(genos) != len(model.genotypes):
+      # Filled element-wise, since numpy would unpack Genotype sequences
+      genos = np.empty(len(model.genotypes), dtype=object)
+      for j,g in enumerate(model.genotypes):
+        genos[j] = g
+      model._genotype_objects = genos
+
+    return genos
+
+  def aligned_zeros(n, alignment=DATA_ALIGNMENT):
+    '''
+    Return a zero-filled array of n bytes whose first element is aligned to
+    a multiple of alignment bytes.  The returned array is a view that keeps
+    its over-allocated base array alive.
+
+    >>> data = aligned_zeros(5)
+    >>> len(data), data.ctypes.data % DATA_ALIGNMENT
+    (5, 0)
+    '''
+    base  = np.zeros(n+alignment-1, dtype=np.ubyte)
+    start = -base.ctypes.data % alignment
+    return base[start:start+n]
+
+
   class GenotypeArray(object):
-    __slots__ = ('descriptor','data')
+    __slots__ = ('descriptor','_data')
 
     def __init__(self, descriptor, genos=None):
       '''
@@ -393,11 +544,31 @@ except ImportError:
       elif isinstance(descriptor, GenotypeArray):
         self.descriptor = descriptor.descriptor
 
-      self.data = np.zeros(self.descriptor.byte_size, dtype=np.ubyte)
+      self._data = aligned_zeros(self.descriptor.byte_size)
 
-      if genos is not None:
+      # FASTPATH: Copy the packed data of arrays sharing our descriptor
+      if isinstance(genos, GenotypeArray) and genos.descriptor is self.descriptor:
+        self._data[:] = genos._data
+      elif genos is not None:
         self[:] = genos
 
+    def _get_data(self):
+      return self._data
+
+    def _set_data(self, new_data):
+      '''
+      Copy new_data into the existing aligned buffer, which must be an
+      ndarray of the same size
+      '''
+      if not isinstance(new_data, np.ndarray):
+        raise TypeError('binary data must be ndarray type')
+      if new_data.nbytes != self.descriptor.byte_size:
+        raise ValueError('binary data must be same size as current (%d != %d)'
+                            % (new_data.nbytes,self.descriptor.byte_size))
+      self._data[:] = new_data.view(np.ubyte).ravel()
+
+    data = property(_get_data,_set_data)
+
     def __len__(self):
       '''
       Return the length of this array
@@ -420,13 +591,31 @@ except ImportError:
       descr = self.descriptor
 
       if isinstance(i,slice):
-        x = xrange(*i.indices(len(descr)))
-        return [ self[i] for i in x ]
+        x     = xrange(*i.indices(len(descr)))
+        width = _packed_width(descr)
+
+        if not width or not x:
+          return [ self[j] for j in x ]
+
+        # FASTPATH: Unpack all genotype indices spanned by the slice at once
+        lo     = min(x[0],x[-1])
+        hi     = max(x[0],x[-1])+1
+        inds   = unpack_genotype_indices(self.data, descr.offsets[0]+lo*width, hi-lo, width)
+        inds   = inds[x[0]-lo::i.step or 1]
+        models = descr._models[i]
+        model  = models[0]
+
+        # Gather from a single object array when the slice shares one model
+        if models.count(model) == len(models):
+          return _genotype_objects(model)[inds].tolist()
+
+        return [ m.genotypes[j] for m,j in izip(models,inds.tolist()) ]
+
       elif isinstance(i,(list,tuple)):
         return [ self[j] for j in i ]
 
       model    = descr[i]
-      startbit = descr.offsets[i]
+      startbit = int(descr.offsets[i])
       width    = model.bit_size
       j        = getbits(self.data, startbit, width)
 
@@ -455,27 +644,31 @@ except ImportError:
         if len(x) != n:
           raise IndexError('Invalid slice')
 
-        for g,j in izip(geno,x):
-          self[j] = g
+        width = _packed_width(descr)
 
-        return
+        if not width or not n or abs(x[-1]-x[0]) != n-1:
+          for g,j in izip(geno,x):
+            self[j] = g
+          return
+
+        # FASTPATH: Resolve genotype indices and pack contiguous slices at once
+        models = descr._models[i]
+        inds   = [ g.index if g.__class__ is Genotype and g.model is model
+                           else _resolve_index(model,g)
+                   for model,g in izip(models,geno) ]
+
+        if x[0] > x[-1]:
+          inds.reverse()
 
-      elif isinstance(geno,tuple) and len(geno) == 2:
-        geno = descr[i][geno]
-      elif not isinstance(geno,Genotype):
-        raise GenotypeRepresentationError('Invalid genotype: %s' % geno)
+        lo = min(x[0],x[-1])
+        pack_genotype_indices(self.data, descr.offsets[0]+lo*width, inds, width)
+        return
 
       model    = descr[i]
-      startbit = descr.offsets[i]
+      startbit = int(descr.offsets[i])
       width    = model.bit_size
 
-      if isinstance(geno,Genotype):
-        if geno.model is not model:
-          geno = model[geno.alleles()]
-      else:
-        geno = model[geno]
-
-      setbits(self.data, startbit, geno.index, width)
+      setbits(self.data, startbit, _resolve_index(model,geno), width)
 
     def __repr__(self):
       return repr(list(self))
@@ -485,8 +678,15 @@ except ImportError:
       Return an array of integer genotype indices
       '''
       data    = self.data
-      offsets = self.descriptor.offsets
-      inds    = [ getbits(data, offsets[i], offsets[i+1]-offsets[i]) for i in xrange(len(self)) ]
+      descr   = self.descriptor
+      width   = _packed_width(descr)
+
+      if width:
+        inds  = unpack_genotype_indices(data, descr.offsets[0], len(self), width)
+      else:
+        inds  = [ getbits(data, offset, w) for offset,w in izip(descr.offsets.tolist(),
+                                                                descr.widths.tolist()) ]
+
       return np.asarray(inds,dtype=int)
 
     def counts(self,counts=None,model=None):
@@ -514,7 +714,8 @@ except ImportError:
     and internal representation are the same.
     '''
 
-    __slots__ = ('alleles','genotypes','genomap','bit_size','allow_hemizygote','max_alleles')
+    __slots__ = ('alleles','genotypes','genomap','bit_size','allow_hemizygote','max_alleles',
+                 '_allele_index','_geno_table','_genotype_objects','_tuple_to_index')
 
     def __init__(self, allow_hemizygote=False, max_alleles=None):
       '''
@@ -538,6 +739,15 @@ except ImportError:
       self.max_alleles      = max(2,max_alleles)
       self.bit_size         = genotype_bit_size(self.max_alleles,allow_hemizygote)
       self.allow_hemizygote = allow_hemizygote
+      self._allele_index    = {}
+
+      # SNP models hold at most three alleles, including the missing allele,
+      # so every genotype can be found in a 16 entry table indexed by
+      # (allele1_index<<2)|allele2_index.
+      self._geno_table      = [None]*16 if self.max_alleles <= 2 else None
+      self._genotype_objects = None
+      self._tuple_to_index   = {}
+
       self.add_genotype( (None,None) )
 
     def get_allele(self, allele):
@@ -551,8 +761,8 @@ except ImportError:
       @rtype       : int
       '''
       try:
-        return self.alleles.index(allele)
-      except ValueError:
+        return self._allele_index[allele]
+      except KeyError:
         raise GenotypeLookupError,allele
 
     def add_allele(self, allele):
@@ -566,14 +776,16 @@ except ImportError:
       @return      : allele representation
       @rtype       : int
       '''
-      if allele in self.alleles:
-        return self.alleles.index(allele)
+      index = self._allele_index.get(allele)
+      if index is not None:
+        return index
 
       n = len(self.alleles)
       new_width = genotype_bit_size(n,self.allow_hemizygote)
       if new_width > self.bit_size:
         raise GenotypeRepresentationError('Allele cannot be added to model due to fixed bit width')
       self.alleles.append(allele)
+      self._allele_index[allele] = n
 
       return n
 
@@ -591,17 +803,81 @@ except ImportError:
       if isinstance(geno,Genotype):
         if geno.model is self:
           return geno
+
+        # FASTPATH: Translate genotypes from other SNP models by allele index
+        table = self._geno_table
+        if table is not None:
+          alleles = geno.model.alleles
+          index   = self._allele_index
+          try:
+            g = table[(index[alleles[geno.allele1_index]]<<2)|index[alleles[geno.allele2_index]]]
+          except KeyError:
+            g = None
+          if g is not None:
+            return g
+
         geno = geno.alleles()
 
+      # Genotypes are mapped only by their ordered allele tuple
       try:
         return self.genomap[geno]
       except KeyError:
-        if (geno[0] in self.alleles and geno[1] in self.alleles and
-           (self.allow_hemizygote or not _hemi(geno))):
-          return self.add_genotype(geno)
-        raise GenotypeLookupError,geno
+        pass
+
+      key = _genotype_key(geno)
+      if key is not None:
+        g = self.genomap.get(key)
+        if g is not None:
+          return g
+        if (key[0] in self._allele_index and key[1] in self._allele_index and
+           (self.allow_hemizygote or not _hemi(key))):
+          return self.add_genotype(key)
 
-    __getitem__ = get_genotype
+      raise GenotypeLookupError,geno
+
+    def __getitem__(self, geno):
+      '''
+      Return the genotype object for a genotype index, i.e. model.genotypes[geno]
+      when geno is an integer, otherwise as given by get_genotype.
+
+      @param geno: genotype index, tuple, or object
+      @type  geno: int, 2-tuple of allele objects, or Genotype
+      @return    : genotype object
+      @rtype     : Genotype
+      '''
+      if isinstance(geno,(int,long,np.integer)):
+        n = len(self.genotypes)
+        i = int(geno)
+        if i < 0:
+          i += n
+        if not 0 <= i < n:
+          raise IndexError('genotype index out of range')
+        return self.genotypes[i]
+      return self.get_genotype(geno)
+
+    def _get_index(self, allele1, allele2):
+      '''
+      Return the genotype index for a pair of alleles without retrieving the
+      genotype object.  If the specified genotype does not belong to this
+      model, a GenotypeLookupError is raised.
+
+      @param allele1: first allele
+      @type  allele1: object, usually str
+      @param allele2: second allele
+      @type  allele2: object, usually str
+      @return       : genotype index
+      @rtype        : int
+
+      >>> model = build_model('AB')
+      >>> model._get_index('B','A'),model._get_index(None,None)
+      (2, 0)
+      '''
+      if allele2 < allele1:
+        allele1,allele2 = allele2,allele1
+      try:
+        return self._tuple_to_index[allele1,allele2]
+      except KeyError:
+        return self.get_genotype( (allele1,allele2) ).index
 
     def __contains__(self, geno):
       '''
@@ -633,14 +909,17 @@ except ImportError:
           return geno
         geno = geno.alleles()
 
-      g = self.genomap.get(geno)
+      # Equivalent to sorted(geno), with None ordered first
+      allele1,allele2 = geno
+      if allele2 < allele1:
+        allele1,allele2 = allele2,allele1
+
+      g = self.genomap.get( (allele1,allele2) )
 
       # If the genotype has not already been seen for this locus
       if g is not None:
         return g
 
-      allele1,allele2 = sorted(geno)
-
       index1 = self.add_allele(allele1)
       index2 = self.add_allele(allele2)
 
@@ -655,7 +934,11 @@ except ImportError:
 
       self.genotypes.append(g)
       self.genomap[allele1,allele2] = g
-      self.genomap[allele2,allele1] = g
+      self._tuple_to_index[allele1,allele2] = g.index
+
+      if self._geno_table is not None:
+        self._geno_table[(index1<<2)|index2] = g
+        self._geno_table[(index2<<2)|index1] = g
 
       return g
 
@@ -721,6 +1004,15 @@ except ImportError:
     if len(genos1) != len(genos2):
       raise ValueError("genotype vector sizes do not match: %zd != %zd" % (len(genos1),len(genos2)))
 
+    # FASTPATH: Compare packed genotype indices directly when both arrays
+    #           share a descriptor, since index 0 is always missing
+    if (isinstance(genos1,GenotypeArray) and isinstance(genos2,GenotypeArray)
+        and genos1.descriptor is genos2.descriptor and _packed_width(genos1.descriptor)):
+      a = genos1.indices()
+      b = genos2.indices()
+      informative = (a!=0)&(b!=0)
+      return int((informative&(a==b)).sum()),int(informative.sum())
+
     concordant = comparisons = 0
     for a,b in izip(genos1,genos2):
       if a and b:
@@ -851,6 +1143,19 @@ except ImportError:
     elif len(counts) != 4:
       raise ValueError('invalid count array')
 
+    # FASTPATH: Tally genotype indices of single-model packed arrays and
+    #           apportion them to the category of each genotype
+    if isinstance(genos,GenotypeArray) and len(genos) and _packed_width(genos.descriptor):
+      models = genos.descriptor._models
+      model  = models[0]
+      if models.count(model) == len(models):
+        inds  = np.bincount(genos.indices(), minlength=len(model.genotypes))
+        cats  = [ model.genotypes[j].category for j in xrange(len(inds)) ]
+        tally = np.bincount(cats, weights=inds, minlength=4).astype(int)
+        for c,n in enumerate(tally):
+          counts[c] += n
+        return np.array(counts,dtype=int)
+
     for geno in genos:
       counts[geno.category] += 1
     return np.array(counts,dtype=int)
@@ -1146,6 +1451,282 @@ except ImportError:
 ###############################################################################
 
 
+# Marks characters and allele pairs that have no representation in a string LUT
+STR_LUT_INVALID = 0xFF
+
+
+def make_str_lut(model, missing_alleles=' '):
+  '''
+  Build lookup tables that translate genotype strings composed of two single
+  character alleles into genotype indices within model.  The first table
+  maps character codes to allele indices and the second maps
+  (allele1_index<<4)|allele2_index to genotype indices.  Characters and
+  allele pairs not present in the model map to STR_LUT_INVALID.
+
+  @param            model: genotype model
+  @type             model: UnphasedMarkerModel
+  @param  missing_alleles: characters that denote a missing allele
+  @type   missing_alleles: str
+  @return                : character and allele pair lookup tables
+  @rtype                 : tuple of two 256 element np.uint8 arrays
+
+  >>> model = build_model('AB')
+  >>> char_lut,pair_lut = make_str_lut(model)
+  >>> char_lut[[ord(c) for c in ' ABC']].tolist()
+  [0, 1, 2, 255]
+  >>> pair_lut[[0x00,0x11,0x12,0x21,0x22,0x01]].tolist()
+  [0, 1, 2, 2, 3, 255]
+  >>> make_str_lut(build_model(['AA','BB']))
+  Traceback (most recent call last):
+       ...
+  GenotypeRepresentationError: Model alleles cannot be represented by single characters
+  '''
+  alleles = model.alleles
+
+  if len(alleles) > 16 or any(a is not None and (not isinstance(a,str) or len(a)!=1) for a in alleles):
+    raise GenotypeRepresentationError('Model alleles cannot be represented by single characters')
+
+  char_lut = np.empty(256, dtype=np.uint8)
+  char_lut.fill(STR_LUT_INVALID)
+
+  for c in missing_alleles:
+    char_lut[ord(c)] = 0
+
+  for i,a in enumerate(alleles):
+    if a is not None:
+      char_lut[ord(a)] = i
+
+  pair_lut = np.empty(256, dtype=np.uint8)
+  pair_lut.fill(STR_LUT_INVALID)
+
+  for g in model.genotypes:
+    index1 = alleles.index(g.allele1)
+    index2 = alleles.index(g.allele2)
+    pair_lut[(index1<<4)|index2] = pair_lut[(index2<<4)|index1] = g.index
+
+  return char_lut,pair_lut
+
+
+def pack_strs(model, genos, luts=None, missing_alleles=' '):
+  '''
+  Translate a sequence of genotype strings composed of two single character
+  alleles, e.g. the GLU 'snp' representation, into genotype indices within
+  model using two table lookups per genotype.  Empty strings denote the
+  missing genotype.  A GenotypeLookupError is raised for genotypes not
+  already present in the model.
+
+  @param            model: genotype model
+  @type             model: UnphasedMarkerModel
+  @param            genos: genotype strings
+  @type             genos: sequence of str
+  @param             luts: lookup tables returned by make_str_lut for model, optional
+  @type              luts: tuple of two np.uint8 arrays
+  @param  missing_alleles: characters that denote a missing allele
+  @type   missing_alleles: str
+  @return                : genotype indices
+  @rtype                 : np.uint8 array
+
+  >>> model = build_model('AB')
+  >>> pack_strs(model, ['AA','AB','BA','BB','  ']).tolist()
+  [1, 2, 2, 3, 0]
+  >>> pack_strs(model, ['AB','','BB']).tolist()
+  [2, 0, 3]
+  >>> pack_strs(model, ['AB','AC'])
+  Traceback (most recent call last):
+       ...
+  GenotypeLookupError: 'AC'
+  '''
+  char_lut,pair_lut = luts if luts is not None else make_str_lut(model, missing_alleles)
+  char_lut = char_lut.tolist()
+  pair_lut = pair_lut.tolist()
+
+  # FASTPATH: Two character strings of known alleles and genotypes
+  try:
+    inds = [ pair_lut[(char_lut[ord(a)]<<4)|char_lut[ord(b)]] for a,b in genos ]
+  except (TypeError,ValueError,IndexError):
+    inds = None
+
+  if inds is None or STR_LUT_INVALID in inds:
+    inds = []
+    for g in genos:
+      if not g:
+        inds.append(0)
+        continue
+
+      try:
+        a,b = g
+        index = pair_lut[(char_lut[ord(a)]<<4)|char_lut[ord(b)]]
+      except (TypeError,ValueError,IndexError):
+        index = STR_LUT_INVALID
+
+      if index == STR_LUT_INVALID:
+        raise GenotypeLookupError(g)
+
+      inds.append(index)
+
+  return np.array(inds, dtype=np.uint8)
+
+
+def pack_strs_bulk(model, genos, luts=None, missing_alleles=' '):
+  '''
+  Translate a sequence of genotype strings composed of two single character
+  alleles into genotype indices within model, as pack_strs, but using
+  vectorized table lookups over all strings at once.
+
+  @param            model: genotype model
+  @type             model: UnphasedMarkerModel
+  @param            genos: genotype strings
+  @type             genos: sequence of str
+  @param             luts: lookup tables returned by make_str_lut for model, optional
+  @type              luts: tuple of two np.uint8 arrays
+  @param  missing_alleles: characters that denote a missing allele
+  @type   missing_alleles: str
+  @return                : genotype indices
+  @rtype                 : np.uint8 array
+
+  >>> model = build_model('AB')
+  >>> pack_strs_bulk(model, ['AA','AB','BA','BB','  ','']).tolist()
+  [1, 2, 2, 3, 0, 0]
+  >>> pack_strs_bulk(model, ['','']).tolist()
+  [0, 0]
+  >>> pack_strs_bulk(model, ['AB','A'])
+  Traceback (most recent call last):
+       ...
+  GenotypeLookupError: 'A'
+  >>> pack_strs_bulk(model, ['AB','AC'])
+  Traceback (most recent call last):
+       ...
+  GenotypeLookupError: 'AC'
+  '''
+  if luts is None:
+    luts = make_str_lut(model, missing_alleles)
+
+  char_lut,pair_lut = luts
+
+  # Empty strings are padded with NUL characters
+  chars = np.array(genos, dtype=str)
+  n     = len(chars)
+
+  if chars.dtype.itemsize == 0:
+    return np.zeros(n, dtype=np.uint8)
+  elif chars.dtype.itemsize == 2:
+    chars = chars.view(np.uint8).reshape(n,2)
+    empty = chars==0
+    a     = char_lut[chars[:,0]]
+    b     = char_lut[chars[:,1]]
+    a[empty[:,0]] = 0
+    b[empty[:,1]] = 0
+
+    # Alleles with no representation map to STR_LUT_INVALID, which is
+    # larger than any valid allele index
+    if not ((a|b) > 15).any() and (empty[:,0]==empty[:,1]).all():
+      inds = pair_lut[(a<<4)|b]
+      if not (inds==STR_LUT_INVALID).any():
+        return inds
+
+  # SLOW PATH: Report the first invalid genotype
+  return pack_strs(model, genos, luts)
+
+
+def genoarray_from_strings(descr, genos, genorepr, luts=None):
+  '''
+  Construct a GenotypeArray from a sequence of genotype strings.  When all
+  loci share a single model with byte-aligned genotype fields and genorepr
+  encodes genotypes as two single character alleles, the strings are
+  translated with pack_strs_bulk and packed directly into the array data
+  without creating intermediate genotype tuples or objects.  Otherwise the
+  strings are parsed by genorepr and assigned as usual.
+
+  @param     descr: genotype array representation
+  @type      descr: GenotypeArrayDescriptor
+  @param     genos: genotype strings
+  @type      genos: sequence of str
+  @param  genorepr: representation of the genotype strings
+  @type   genorepr: UnphasedMarkerRepresentation or similar object
+  @param      luts: lookup tables returned by make_str_lut for the model of descr, optional
+  @type       luts: tuple of two np.uint8 arrays
+  @return         : genotype array
+  @rtype          : GenotypeArray
+
+  >>> from glu.lib.genolib.reprs import snp,hapmap,marker
+  >>> model = build_model('AB')
+  >>> descr = GenotypeArrayDescriptor([model]*5)
+  >>> genoarray_from_strings(descr, ['AA','BA','  ','BB',''], snp)
+  [('A', 'A'), ('A', 'B'), (None, None), ('B', 'B'), (None, None)]
+  >>> genoarray_from_strings(descr, ['AA','BA','NN','BB','AB'], hapmap)
+  [('A', 'A'), ('A', 'B'), (None, None), ('B', 'B'), ('A', 'B')]
+  >>> genoarray_from_strings(descr, ['A/A','B/A','','B/B','A/B'], marker)
+  [('A', 'A'), ('A', 'B'), (None, None), ('B', 'B'), ('A', 'B')]
+  '''
+  width  = _packed_width(descr)
+  models = descr._models
+
+  # FASTPATH: Pack genotype indices translated by string lookup tables
+  if (width and models and not genorepr.delimiter and len(genos) == len(models)
+            and models.count(models[0]) == len(models)):
+    missing = ''.join(a for a in genorepr.missing_allele_strs if len(a)==1)
+    try:
+      inds = pack_strs_bulk(models[0], genos, luts, missing)
+    except (GenotypeLookupError,GenotypeRepresentationError):
+      pass
+    else:
+      result = GenotypeArray(descr)
+      pack_genotype_indices(result.data, int(descr.offsets[0]), inds, width)
+      return result
+
+  return GenotypeArray(descr, genorepr.from_strings(genos))
+
+
+def batch_concordance(genos, pairs):
+  '''
+  Generate simple concordance statistics for many pairs of genotype arrays
+  drawn from a common collection, e.g. pairs of samples within a cohort.
+
+  @param genos: genotype arrays
+  @type  genos: sequence of GenotypeArray or sequences of genotypes
+  @param pairs: pairs of indices into genos to compare
+  @type  pairs: sequence of (int,int)
+  @return     : number of concordant genotypes and number of non-missing
+                comparisons made for each pair
+  @rtype      : tuple of two np.int64 arrays
+
+  >>> model = build_model('AB')
+  >>> NN,AA,AB,BB = model.genotypes
+  >>> descr = GenotypeArrayDescriptor([model]*4)
+  >>> genos = [ GenotypeArray(descr,g) for g in ([AA,AB,BB,NN],[AA,BB,BB,AA],[NN,AB,BB,AA]) ]
+  >>> matches,comparisons = batch_concordance(genos, [(0,1),(0,2),(1,2)])
+  >>> matches.tolist(),comparisons.tolist()
+  ([2, 2, 2], [3, 2, 3])
+  >>> matches,comparisons = batch_concordance([list(g) for g in genos], [(1,2)])
+  >>> matches.tolist(),comparisons.tolist()
+  ([2], [3])
+  '''
+  pairs       = np.asarray(pairs, dtype=int).reshape(-1,2)
+  matches     = np.zeros(len(pairs), dtype=np.int64)
+  comparisons = np.zeros(len(pairs), dtype=np.int64)
+
+  # FASTPATH: The pure-Python concordance decodes both arrays of each pair,
+  #           so decode every array that shares a packed descriptor just once
+  decoded = {}
+  if GENO_ARRAY_VERSION == 'Python':
+    for i in np.unique(pairs).tolist():
+      g = genos[i]
+      if isinstance(g,GenotypeArray) and _packed_width(g.descriptor):
+        decoded[i] = g.descriptor,g.indices()
+
+  for k,(i,j) in enumerate(pairs.tolist()):
+    if i in decoded and j in decoded and decoded[i][0] is decoded[j][0]:
+      a = decoded[i][1]
+      b = decoded[j][1]
+      informative    = (a!=0)&(b!=0)
+      matches[k]     = (informative&(a==b)).sum()
+      comparisons[k] = informative.sum()
+    else:
+      matches[k],comparisons[k] = genoarray_concordance(genos[i],genos[j])
+
+  return matches,comparisons
+
+
 def count_genotypes2(genos1,genos2):
   '''
   Count the two-locus genotypes belonging to the two specified models and
@@ -1789,6 +2370,18 @@ def test_genotypes():
   >>> all( not ((g1==g2) ^ (hash(g1)==hash(g2))) for g1 in model.genotypes for g2 in model2.genotypes)
   True
 
+  # Test lookup by index
+  >>> model[0],model[4],model[-1]
+  ((None, None), ('A', 'B'), ('B', 'B'))
+  >>> all( model[int(g.index)] is g for g in model.genotypes )
+  True
+  >>> model[4L] is model[np.uint8(4)] is model['A','B']
+  True
+  >>> model[len(model.genotypes)]
+  Traceback (most recent call last):
+       ...
+  IndexError: genotype index out of range
+
   # Test contains
   >>> model['A','A'] in model
   True
@@ -1799,6 +2392,13 @@ def test_genotypes():
   >>> model2['A','A'] in model
   True
 
+  # Test translation between models
+  >>> model5 = build_model('BA',genotypes=[('B','B'),('A','B')])
+  >>> all( model[g] is model[g.alleles()] for g in model5.genotypes )
+  True
+  >>> model5['A','B'] in build_model('C')
+  False
+
   # Test model compatibility
   >>> model1 = build_model('A')
   >>> model2 = build_model('AB')
@@ -1858,6 +2458,58 @@ def test_tolist():
   '''
 
 
+def test_slices():
+  '''
+  >>> model = build_model('AB')
+  >>> NN,AA,AB,BB = model.genotypes
+  >>> descr = GenotypeArrayDescriptor([model]*7)
+  >>> genos = GenotypeArray(descr,[NN,AA,AB,AB,BB,NN,AA])
+  >>> genos[1:5]
+  [('A', 'A'), ('A', 'B'), ('A', 'B'), ('B', 'B')]
+  >>> genos[::3]
+  [(None, None), ('A', 'B'), ('A', 'A')]
+  >>> genos[5:1:-2]
+  [(None, None), ('A', 'B')]
+  >>> genos[::-1]
+  [('A', 'A'), (None, None), ('B', 'B'), ('A', 'B'), ('A', 'B'), ('A', 'A'), (None, None)]
+  >>> genos[3:3]
+  []
+
+  >>> genos[2:6] = [('B','B'),BB,('A','A'),AB]
+  >>> genos[:]
+  [(None, None), ('A', 'A'), ('B', 'B'), ('B', 'B'), ('A', 'A'), ('A', 'B'), ('A', 'A')]
+  >>> genos[6:0:-2] = [BB,NN,AA]
+  >>> genos[:]
+  [(None, None), ('A', 'A'), ('A', 'A'), ('B', 'B'), (None, None), ('A', 'B'), ('B', 'B')]
+  >>> genos[::-1] = genos[:]
+  >>> genos[:]
+  [('B', 'B'), ('A', 'B'), (None, None), ('B', 'B'), ('A', 'A'), ('A', 'A'), (None, None)]
+  >>> copy = GenotypeArray(genos,genos)
+  >>> copy[0] = NN
+  >>> copy[:2],genos[:2]
+  ([(None, None), ('A', 'B')], [('B', 'B'), ('A', 'B')])
+
+  >>> model = build_model('AB',max_alleles=5)
+  >>> NN,AA,AB,BB = model.genotypes
+  >>> descr = GenotypeArrayDescriptor([model]*5)
+  >>> genos = GenotypeArray(descr,[NN,AA,AB,AB,BB])
+  >>> genos[1:4] = [BB,NN,AA]
+  >>> genos[:]
+  [(None, None), ('B', 'B'), (None, None), ('A', 'A'), ('B', 'B')]
+  >>> list(genos.indices())
+  [0, 3, 0, 1, 3]
+
+  >>> model = UnphasedMarkerModel(max_alleles=4)
+  >>> descr = GenotypeArrayDescriptor([model]*3)
+  >>> genos = GenotypeArray(descr,[model.add_genotype(('A','A'))]*3)
+  >>> genos[1:]
+  [('A', 'A'), ('A', 'A')]
+  >>> genos[2] = model.add_genotype(('A','C'))
+  >>> genos[1:]
+  [('A', 'A'), ('A', 'C')]
+  '''
+
+
 def test_indices():
   '''
   >>> model = build_model('AB')
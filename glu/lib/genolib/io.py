@@ -9,6 +9,7 @@ __revision__  = '$Id$'
 
 
 import os
+import shutil
 
 from   glu.lib.utils             import is_str
 from   glu.lib.fileutils         import namefile, parse_augmented_filename, get_arg
@@ -106,6 +107,9 @@ def load_genostream(filename, transform=None, extra_args=None, **kwargs):
   @type    genome: str or Genome instance
   @para   phenome: Pedigree and phenotype metadata or filename
   @type   phenome: str or Phenome instance
+  @param extra_args: optional dictionary to store extraneous arguments, instead of
+                     raising an error.
+  @type  extra_args: dict
   @return        : loaded genomatrix stream
   @rtype         : GenomatrixStream
 
@@ -132,11 +136,14 @@ def load_genostream(filename, transform=None, extra_args=None, **kwargs):
   ('s2', 'l1', ('A', 'G'))
   ('s2', 'l2', ('C', 'C'))
   '''
+  # Keyword arguments are merged into and consumed from extra_args, so that
+  # callers can inspect any arguments left unused
   if extra_args is None:
     args = kwargs
   else:
     args = extra_args
-    args.update(kwargs)
+    if kwargs:
+      args.update(kwargs)
 
   filename = parse_augmented_filename(filename,args)
 
@@ -209,6 +216,52 @@ def load_genostream(filename, transform=None, extra_args=None, **kwargs):
   return genos
 
 
+def make_genostream_loader(transform=None, **kwargs):
+  '''
+  Return a function of a single file name that loads genotype streams with
+  fixed arguments.  String genotype representations, genomes and phenomes
+  are converted to objects once, rather than for each file loaded, and
+  are shared by all streams loaded by the resulting function.  Per-file
+  options may still be given by augmented file names.
+
+  @param transform: transformation object (optional)
+  @type  transform: GenoTransform object
+  @param    kwargs: arguments to load_genostream
+  @type     kwargs: dict
+  @return         : genotype stream loader
+  @rtype          : callable
+
+  >>> from StringIO import StringIO
+  >>> load = make_genostream_loader(format='ldat',genorepr='snp')
+  >>> for f in ["ldat\\ts1\\ts2\\nl1\\tAA\\tAG\\n","ldat\\ts1\\ts3\\nl2\\tCT\\tTT\\n"]:
+  ...   genos = load(StringIO(f))
+  ...   print genos.columns,list(genos)
+  ('s1', 's2') [('l1', [('A', 'A'), ('A', 'G')])]
+  ('s1', 's3') [('l2', [('C', 'T'), ('T', 'T')])]
+  >>> sorted(genos.genome.loci)
+  ['l1', 'l2']
+  '''
+  if is_str(kwargs.get('genorepr')):
+    kwargs['genorepr'] = get_genorepr(kwargs['genorepr'])
+
+  genome = kwargs.get('genome')
+  if genome is None:
+    kwargs['genome'] = Genome()
+  elif is_str(genome):
+    kwargs['genome'] = load_genome(genome)
+
+  phenome = kwargs.get('phenome')
+  if phenome is None:
+    kwargs['phenome'] = Phenome()
+  elif is_str(phenome):
+    kwargs['phenome'] = load_phenome(phenome)
+
+  def _load(filename):
+    return load_genostream(filename,transform=transform,**kwargs)
+
+  return _load
+
+
 def save_genostream(filename, genos, extra_args=None, **kwargs):
   '''
   Write genotype data to file
@@ -226,12 +279,18 @@ def save_genostream(filename, genos, extra_args=None, **kwargs):
   @type  mergefunc: callable
   @param  compress: flag indicating if a compressed format is desired. Default is True
   @type   compress: bool
+  @param extra_args: optional dictionary to store extraneous arguments, instead of
+                     raising an error.
+  @type  extra_args: dict
   '''
+  # Keyword arguments are merged into and consumed from extra_args, so that
+  # callers can inspect any arguments left unused
   if extra_args is None:
     args = kwargs
   else:
     args = extra_args
-    args.update(kwargs)
+    if kwargs:
+      args.update(kwargs)
 
   filename  = parse_augmented_filename(filename,args)
 
@@ -302,10 +361,40 @@ def transform_files(infiles,informat,ingenorepr,
   s1  l2
   s2  l2      C/T
   s3  l2      T/T
+
+  Binary files are copied verbatim when no conversion is required:
+
+  >>> import tempfile
+  >>> src = tempfile.NamedTemporaryFile(suffix='.lbat')
+  >>> dst = tempfile.NamedTemporaryFile(suffix='.lbat')
+  >>> src.write('not parsed'); src.flush()
+  >>> transform_files([src.name],None,None,dst.name,None,None)
+  >>> open(dst.name,'rb').read()
+  'not parsed'
+
+  Multiple inputs are merged with or without a transformation:
+
+  >>> data1 = StringIO("ldat\\ts1\\ts2\\nl1\\tAA\\tAG\\n")
+  >>> data2 = StringIO("ldat\\ts1\\ts3\\nl2\\tCT\\tTT\\n")
+  >>> out   = StringIO()
+  >>> transform_files([data1,data2],'ldat','snp',out,'ldat','snp',mergefunc='unanimous')
+  >>> print out.getvalue() # doctest: +NORMALIZE_WHITESPACE
+  ldat  s1  s2  s3
+  l1    AA  AG
+  l2    CT      TT
   '''
   if informat is None:
     informat = guess_informat_list(infiles)
 
+  # FASTPATH: Copy a binary file verbatim when it would be decoded and
+  #           re-encoded unchanged
+  if (len(infiles)==1 and informat in BINARY_COPY_FORMATS and mergefunc is None
+                      and genome is None and phenome is None
+                      and (outformat or guess_outformat(outfile))==informat
+                      and _null_transform(transform)
+                      and _copy_file(infiles[0],outfile)):
+    return
+
   if is_str(ingenorepr):
     ingenorepr = get_genorepr(ingenorepr)
 
@@ -315,22 +404,13 @@ def transform_files(infiles,informat,ingenorepr,
   if not outgenorepr:
     outgenorepr = ingenorepr
 
-  if genome is None:
-    genome = Genome()
-  elif is_str(genome):
-    genome = load_genome(genome)
-
-  if phenome is None:
-    phenome = Phenome()
-  elif is_str(phenome):
-    phenome = load_phenome(phenome)
-
   if is_str(mergefunc):
     mergefunc = get_genomerger(mergefunc)
 
-  genos = [ load_genostream(f,format=informat,genorepr=ingenorepr,
-                              genome=genome,phenome=phenome,transform=transform,
-                              hyphen=inhyphen) for f in infiles ]
+  load  = make_genostream_loader(format=informat,genorepr=ingenorepr,
+                                 genome=genome,phenome=phenome,transform=transform,
+                                 hyphen=inhyphen)
+  genos = [ load(f) for f in infiles ]
   n = len(genos)
 
   if outformat is None:
@@ -360,13 +440,74 @@ def transform_files(infiles,informat,ingenorepr,
     raise NotImplementedError("Format '%s' is not supported" % outformat)
 
   # Order again after merging, if necessary
-  if n>1 and (transform.loci.order or transform.samples.order):
-    genos = genos.transformed(order_loci=transform.loci.order,
-                              order_samples=transform.samples.order)
+  if n>1 and transform is not None:
+    transform     = GenoTransform.from_object(transform)
+    order_loci    = transform.loci.order
+    order_samples = transform.samples.order
+
+    if order_loci or order_samples:
+      genos = genos.transformed(order_loci=order_loci,order_samples=order_samples)
 
   save_genostream(outfile,genos,format=outformat,genorepr=outgenorepr,hyphen=outhyphen)
 
 
+# Formats that are self-describing so that files can be copied without
+# conversion
+BINARY_COPY_FORMATS = set(['lbat','sbat','tbat'])
+
+
+def _null_transform(transform):
+  '''
+  Return True if transform specifies no filtering, renaming, ordering,
+  recoding or repacking of genotypes.
+
+  >>> _null_transform(None)
+  True
+  >>> _null_transform(GenoTransform.from_kwargs())
+  True
+  >>> _null_transform(GenoTransform.from_kwargs(order_loci=[]))
+  False
+  '''
+  if transform is None:
+    return True
+
+  transform = GenoTransform.from_object(transform)
+
+  for sub in (transform.samples,transform.loci):
+    if sub.include is not None or sub.exclude is not None or sub.rename or sub.order is not None:
+      return False
+
+  return not (transform.recode_models or transform.rename_alleles or transform.repack
+           or transform.filter_founders or transform.filter_nonfounders
+           or transform.filter_missing_genotypes)
+
+
+def _copy_file(infile, outfile, bufsize=1<<20):
+  '''
+  Copy infile to outfile if both are plain file names, without augmented
+  arguments, that refer to different files.  Returns True if the file was
+  copied.
+  '''
+  for filename in (infile,outfile):
+    if not is_str(filename) or filename == '-' or ':' in filename:
+      return False
+
+  infile  = os.path.expanduser(infile)
+  outfile = os.path.expanduser(outfile)
+
+  if not os.path.isfile(infile):
+    return False
+
+  if os.path.exists(outfile) and os.path.samefile(infile,outfile):
+    return False
+
+  with open(infile,'rb') as src:
+    with open(outfile,'wb') as dst:
+      shutil.copyfileobj(src,dst,bufsize)
+
+  return True
+
+
 def test():
   import doctest
   return doctest.testmod()
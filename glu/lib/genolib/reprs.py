@@ -321,6 +321,12 @@ marker = UnphasedMarkerRepresentation(delimiter='/',missing_geno_str='',missing_
                                       missing_allele_str='',missing_allele_strs=['',' '])
 
 
+GENOREPRS = { 'snp'    : snp,
+              'isnp'   : isnp,
+              'hapmap' : hapmap,
+              'marker' : marker }
+
+
 def get_genorepr(reprname):
   '''
   Retrieve the supported genotype representation. Otherwise raises an ValueError exception
@@ -329,18 +335,21 @@ def get_genorepr(reprname):
   @type  reprname: str
   @return        : supported genotype representation
   @rtype         : genotype representation object
-  '''
-
-  reprs = { 'snp'    : snp,
-            'isnp'   : isnp,
-            'hapmap' : hapmap,
-            'marker' : marker }
 
+  >>> get_genorepr('hapmap') is hapmap
+  True
+  >>> get_genorepr(None) is snp
+  True
+  >>> get_genorepr('foo')
+  Traceback (most recent call last):
+       ...
+  ValueError: Unknown genotype representation: foo
+  '''
   if not reprname:
     reprname = 'snp'
 
   try:
-    return reprs[reprname]
+    return GENOREPRS[reprname]
   except KeyError:
     raise ValueError('Unknown genotype representation: %s' % reprname)
 
@@ -1626,6 +1626,22 @@ class GenomatrixStream(GenotypeStream):
 class NonUniqueError(ValueError): pass
 
 
+def _duplicate_labels(labels):
+  '''
+  Return a list of (label,count) for all labels that appear more than once
+
+  >>> _duplicate_labels(['L1','L2','L3'])
+  []
+  >>> _duplicate_labels(['L1','L2','L1'])
+  [('L1', 2)]
+  '''
+  # FASTPATH: Nearly all label sets are unique, which a set detects in one pass
+  if len(set(labels)) == len(labels):
+    return []
+
+  return [ (k,n) for k,n in Counter(labels).iteritems() if n>1 ]
+
+
 def unique_check_genomatrixstream(genos):
   '''
   Check that all row and column labels of a genomatrix are unique.  Raises
@@ -1678,20 +1694,22 @@ def unique_check_genomatrixstream(genos):
   '''
   assert genos.columns is not None
 
-  if genos.loci is not None:
-    dup_loci = [ (k,n) for k,n in Counter(genos.loci).iteritems() if n>1 ]
+  samples,loci = genos.samples,genos.loci
+
+  if loci is not None:
+    dup_loci = _duplicate_labels(loci)
     if dup_loci:
       msg = ','.join( '%s:%d' % kv for kv in dup_loci )
       raise NonUniqueError('Non-unique loci: %s' % msg)
 
-  if genos.samples is not None:
-    dup_samples = [ (k,n) for k,n in Counter(genos.samples).iteritems() if n>1 ]
+  if samples is not None:
+    dup_samples = _duplicate_labels(samples)
     if dup_samples:
       msg = ','.join( '%s:%d' % kv for kv in dup_samples )
       raise NonUniqueError('Non-unique samples: %s' % msg)
 
   # FASTPATH: Unique samples and loci
-  if None not in (genos.samples,genos.loci):
+  if samples is not None and loci is not None:
     genos.unique = True
     return genos
 
@@ -50,6 +50,7 @@ import sys
 import time
 import struct
 
+from bisect import bisect_right
 
 try:
     from fcntl import ioctl
@@ -59,6 +60,9 @@ except ImportError:
 
 import signal
 
+# Empty struct winsize buffer for the TIOCGWINSZ ioctl
+_WINSIZE = struct.pack('HHHH', 0, 0, 0, 0)
+
 
 class ProgressBarWidget(object):
     '''This is an element of ProgressBar formatting.
@@ -101,8 +105,16 @@ class ProgressBarWidgetHFill(object):
 
 class ETA(ProgressBarWidget):
     'Widget for the Estimated Time of Arrival'
+    def __init__(self):
+        self.last_seconds = None
+        self.last_time = ''
     def format_time(self, seconds):
-        return time.strftime('%H:%M:%S', time.gmtime(seconds))
+        # Consecutive updates usually fall within the same second
+        seconds = max(0, int(seconds))
+        if seconds != self.last_seconds:
+            self.last_seconds = seconds
+            self.last_time = '%02d:%02d:%02d' % (seconds//3600, seconds//60%60, seconds%60)
+        return self.last_time
     def update(self, pbar):
         if pbar.currval == 0:
             return 'ETA:  --:--:--'
@@ -120,17 +132,15 @@ class ProgressRate(ProgressBarWidget):
         self.unit = unit
         self.fmt = '%6.2f %s'
         self.prefixes = ['', 'K', 'M', 'G', 'T', 'P']
+        self.divisors = [1, 1e3, 1e6, 1e9, 1e12, 1e15]
+        self.cutoffs = self.divisors[1:]
     def update(self, pbar):
         if pbar.seconds_elapsed < 2e-6:#== 0:
             bps = 0.0
         else:
             bps = pbar.currval / pbar.seconds_elapsed
-        spd = bps
-        for u in self.prefixes:
-            if spd < 1000:
-                break
-            spd /= 1000
-        return self.fmt % (spd, u + self.unit + '/s')
+        i = bisect_right(self.cutoffs, bps)
+        return self.fmt % (bps / self.divisors[i], self.prefixes[i] + self.unit + '/s')
 
 
 class RotatingMarker(ProgressBarWidget):
@@ -145,16 +155,31 @@ class RotatingMarker(ProgressBarWidget):
         return self.markers[self.curmark]
 
 
+# Pre-rendered percentages; whole percents are all a bar ever shows
+_PERCENT_STRS = dict( (i, '%3d%%' % i) for i in range(101) )
+
+
 class Percentage(ProgressBarWidget):
     'Just the percentage done.'
     def update(self, pbar):
-        return '%3d%%' % pbar.percentage()
+        p = pbar.percentage()
+        s = _PERCENT_STRS.get(p)
+        if s is None:
+            s = '%3d%%' % p
+        return s
 
 
 class SimpleProgress(ProgressBarWidget):
     "Returns what is already done and the total, e.g.: '5 of 47'"
+    def __init__(self):
+        self.maxval = None
+        self.suffix = None
     def update(self, pbar):
-        return '%d of %d' % (pbar.currval, pbar.maxval)
+        # The total rarely changes, so its half of the text is kept
+        if pbar.maxval != self.maxval or self.suffix is None:
+            self.maxval = pbar.maxval
+            self.suffix = ' of %d' % pbar.maxval
+        return str(int(pbar.currval)) + self.suffix
 
 
 class Completed(ProgressBarWidget):
@@ -179,6 +204,9 @@ class Bar(ProgressBarWidgetHFill):
             m = self.marker
         else:
             m = self.marker.update(pbar)
+        # Single character markers, the usual case, need no trimming
+        if len(m) == 1:
+            return m*width
         return (m*(width//len(m)+1))[:width]
 
     def update(self, pbar, width):
@@ -186,8 +214,7 @@ class Bar(ProgressBarWidgetHFill):
         cwidth = width - len(self.left) - len(self.right)
         marked_width = percent * cwidth // 100
         m = self._format_marker(pbar,marked_width)
-        bar = (self.left + m.ljust(cwidth) + self.right)
-        return bar
+        return ''.join([self.left, m, ' '*(cwidth-marked_width), self.right])
 
 
 class ReverseBar(Bar):
@@ -196,12 +223,15 @@ class ReverseBar(Bar):
         percent = pbar.percentage()
         cwidth = width - len(self.left) - len(self.right)
         marked_width = percent * cwidth // 100
-        m = self._format_marker(pbar)
-        bar = (self.left + (m*marked_width).rjust(cwidth) + self.right)
-        return bar
+        m = self._format_marker(pbar,marked_width)
+        return ''.join([self.left, ' '*(cwidth-marked_width), m, self.right])
 
 
 default_widgets = [Percentage(), ' ', Bar()]
+
+# Widget kinds used by ProgressBar._plan_widgets
+_STATIC, _DYNAMIC, _HFILL = 0, 1, 2
+
 class ProgressBar(object):
     '''This is the ProgressBar class, it updates and prints the bar.
 
@@ -240,7 +270,8 @@ class ProgressBar(object):
     __slots__ = ('maxval', 'currval', 'term_width', 'start_time',
                  'last_update_time', 'seconds_elapsed', 'finished', 'fd',
                  'signal_set', 'widgets', 'update_interval', 'next_update',
-                 'num_intervals')
+                 'num_intervals', 'last_line', 'plan', 'static_width',
+                 'num_hfill', 'resized')
 
     def __init__(self, maxval=100, widgets=default_widgets, term_width=None,
                  fd=sys.stderr):
@@ -248,22 +279,22 @@ class ProgressBar(object):
         self.maxval     = maxval
         self.widgets    = widgets
         self.fd         = fd
+        self._plan_widgets()
         self.signal_set = False
+        self.resized    = False
         if term_width is not None:
             self.term_width = term_width
         else:
+            self._read_term_width()
             try:
-                self._handle_resize(None, None)
                 signal.signal(signal.SIGWINCH, self._handle_resize)
                 self.signal_set = True
-            except (SystemExit, KeyboardInterrupt):
-                raise
-            except:
-                raise
-                self.term_width = int(os.environ.get('COLUMNS', 80)) - 1
+            except (AttributeError, ValueError):
+                # No SIGWINCH on this platform or not in the main thread
+                pass
 
         self.num_intervals = max(100, self.term_width)
-        self.update_interval = self.maxval // self.num_intervals if self.maxval else 1
+        self.update_interval = max(1, self.maxval // self.num_intervals) if self.maxval else 1
         self.next_update = 0
 
         self.currval = 0
@@ -271,43 +302,88 @@ class ProgressBar(object):
         self.start_time = None
         self.last_update_time = None
         self.seconds_elapsed = 0
+        self.last_line = None
 
     def _handle_resize(self, signum, frame):
-        s   = struct.pack('HHHH', 0, 0, 0, 0)
-        h,w = struct.unpack('HHHH', ioctl(self.fd, termios.TIOCGWINSZ, s))[:2]
+        # Defer querying the terminal until the next line is formatted, so
+        # that a burst of resize signals results in a single ioctl
+        self.resized = True
+
+    def _read_term_width(self):
+        '''Query the terminal width, falling back on $COLUMNS or 80 columns
+        when the output is not a terminal or the query is not supported.'''
+        try:
+            h,w = struct.unpack('HHHH', ioctl(self.fd, termios.TIOCGWINSZ, _WINSIZE))[:2]
+        except (SystemExit, KeyboardInterrupt):
+            raise
+        except:
+            w = 0
+        if not w:
+            try:
+                w = int(os.environ.get('COLUMNS', 80)) - 1
+            except ValueError:
+                w = 79
         self.term_width = w
+        self.resized = False
 
     def percentage(self):
         'Returns the percentage of the progress.'
         return self.currval * 100 // self.maxval if self.maxval else None
 
+    def _plan_widgets(self):
+        '''Classify the widgets once, since they are fixed after construction.
+
+        The plan holds (kind, widget) pairs, where kind is _STATIC for
+        strings, _HFILL for ProgressBarWidgetHFill instances and _DYNAMIC
+        for all other widgets.  The total width of the static strings and
+        the number of HFill widgets are also stored.  Runs of adjacent
+        strings are joined into a single static entry.
+        '''
+        self.plan = []
+        self.static_width = 0
+        self.num_hfill = 0
+        for w in self.widgets:
+            if isinstance(w, ProgressBarWidgetHFill):
+                self.plan.append( (_HFILL, w) )
+                self.num_hfill += 1
+            elif isinstance(w, (str, unicode)):
+                if self.plan and self.plan[-1][0] is _STATIC:
+                    self.plan[-1] = (_STATIC, self.plan[-1][1] + w)
+                else:
+                    self.plan.append( (_STATIC, w) )
+                self.static_width += len(w)
+            else:
+                self.plan.append( (_DYNAMIC, w) )
+
     def _format_widgets(self):
         r = []
         hfill_inds = []
-        num_hfill = 0
-        currwidth = 0
-        for i, w in enumerate(self.widgets):
-            if isinstance(w, ProgressBarWidgetHFill):
+        currwidth = self.static_width
+        for kind, w in self.plan:
+            if kind is _STATIC:
                 r.append(w)
-                hfill_inds.append(i)
-                num_hfill += 1
-            elif isinstance(w, (str, unicode)):
-                r.append(w)
-                currwidth += len(w)
-            else:
+            elif kind is _DYNAMIC:
                 weval = w.update(self)
                 currwidth += len(weval)
                 r.append(weval)
-        for iw in hfill_inds:
-            r[iw] = r[iw].update(self, (self.term_width - currwidth) // num_hfill)
+            else:
+                hfill_inds.append(len(r))
+                r.append(w)
+        if hfill_inds:
+            width = (self.term_width - currwidth) // self.num_hfill
+            for iw in hfill_inds:
+                r[iw] = r[iw].update(self, width)
         return r
 
     def _format_line(self):
+        if self.resized:
+            self._read_term_width()
         return ''.join(self._format_widgets()).ljust(self.term_width)
 
     def _next_update(self):
         if self.maxval:
-          return int((int(self.num_intervals * self.currval / self.maxval) + 1) * self.update_interval)
+          # Next multiple of update_interval beyond the current value
+          return (self.currval // self.update_interval + 1) * self.update_interval
         else:
           return self.currval
 
@@ -341,7 +417,11 @@ class ProgressBar(object):
         self.seconds_elapsed = now - self.start_time
         self.next_update = self._next_update()
         if show:
-          self.fd.write(self._format_line() + '\r')
+          # Skip rewriting a line that is already displayed
+          line = self._format_line()
+          if line != self.last_line:
+            self.fd.write(line + '\r')
+            self.last_line = line
         self.last_update_time = now
 
     def start(self,show=True):
@@ -362,9 +442,10 @@ class ProgressBar(object):
     def finish(self, show=True):
         '''Used to tell the progress is finished.'''
         self.finished = True
-        self.update(self.maxval or self.currval,show=show,force=True)
+        self.update(self.maxval or self.currval,show=False,force=True)
+        # Write the final line and newline together in a single call
         if show:
-          self.fd.write('\n')
+          self.fd.write(self._format_line() + '\r\n')
         if self.signal_set:
           signal.signal(signal.SIGWINCH, signal.SIG_DFL)
 
@@ -495,6 +576,11 @@ try:
       self.old_handler = signal.signal(signal.SIGALRM, self._handler)
       self.old_alarm = 0
 
+      # Restart system calls interrupted by the timer rather than failing
+      # them with EINTR, which would otherwise surface as IOError or
+      # OSError in the code being monitored
+      signal.siginterrupt(signal.SIGALRM, False)
+
     def add(self, handler):
       jobid = self.seq
       self.seq += 1
@@ -567,9 +653,9 @@ try:
 
     return _progress()
 
-except ImportError:
+except (ImportError,AttributeError):
 
-  # Fall back to a more portable dumb implementation
+  # Fall back to a more portable implementation where SIGALRM is unavailable
   def progress_loop(items, length=None, update_interval=None, **kwargs):
     if length is None:
       try:
@@ -578,18 +664,39 @@ except ImportError:
       except TypeError:
         pass
 
+    if not update_interval:
+      update_interval = 250
+
     bar = progress_bar(length=length,**kwargs)
 
     if bar is None:
       return items
 
     def _progress():
+      i=0
+
       bar.start()
 
+      # Check the clock every window items, tuning the window to about four
+      # checks per second, and redraw about once per second
+      window     = update_interval
+      next_check = window
+      last_check = last_draw = time.time()
+
       for i,item in enumerate(items):
-        # Do not print status if we're in the background
-        if i%update_interval == 0 and is_foreground():
-          bar.update(i, force=True)
+        if i >= next_check:
+          now = time.time()
+
+          # Do not print status if we're in the background
+          if now - last_draw >= 1 and is_foreground():
+            bar.update(i, force=True)
+            last_draw = now
+
+          # Grow at most fourfold per check, since coarse clocks may
+          # report no elapsed time at all
+          window     = max(1, min(4*window, int(window * 0.25 / max(1e-6, now - last_check))))
+          next_check = i + window
+          last_check = now
 
         yield item
 
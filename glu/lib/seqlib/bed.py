@@ -21,23 +21,31 @@ from   glu.lib.fileutils import autofile
 GOOD,UNALIGNED,TOOSHORT,LOWOVERLAP = range(4)
 
 
+def _merged_name(names):
+  # Most features do not overlap, so skip the set and sort for single names
+  if len(names)==1:
+    return names[0]
+  return ','.join(sorted(set(names)))
+
+
 def merge_features(features):
   features.sort()
 
-  current_start,current_end,current_name = None,None,set()
+  current_start,current_end,current_names = None,None,[]
 
   for feature_start,feature_end,feature_name in features:
     if current_start is None:
-      current_start,current_end,current_name = feature_start,feature_end,set([feature_name])
+      current_start,current_end,current_names = feature_start,feature_end,[feature_name]
     elif current_end<feature_start:
-      yield current_start,current_end,','.join(sorted(current_name))
-      current_start,current_end,current_name = feature_start,feature_end,set([feature_name])
+      yield current_start,current_end,_merged_name(current_names)
+      current_start,current_end,current_names = feature_start,feature_end,[feature_name]
     else:
-      current_name.add(feature_name)
-      current_end = max(current_end,feature_end)
+      current_names.append(feature_name)
+      if current_end<feature_end:
+        current_end = feature_end
 
   if current_start is not None:
-    yield current_start,current_end,','.join(sorted(current_name))
+    yield current_start,current_end,_merged_name(current_names)
 
 
 
@@ -54,7 +62,7 @@ def read_features(filename,merge=True,pad=0):
 
   for row in bed:
     n = len(row)
-    if n<3 or row[0].startswith('track ') or row[0].startswith('#'):
+    if n<3 or row[0].startswith( ('track ','#') ):
       continue
 
     contig,start,end = row[:3]
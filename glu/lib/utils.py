@@ -903,28 +903,48 @@ class iter_queue(deque):
 
 def generator_thread(source, maxsize=1000, chunksize=1000):
   '''
-  Run a generator in a seperate thread
+  Run a generator in a seperate thread.  Exceptions raised by the source
+  are re-raised in the consuming thread.
 
 
   >>> list(generator_thread(range(10)))
   [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+  >>> list(generator_thread(range(10),chunksize=1))
+  [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+  >>> def fail():
+  ...   yield 1
+  ...   raise KeyError('oops')
+  >>> list(generator_thread(fail()))
+  Traceback (most recent call last):
+       ...
+  KeyError: 'oops'
   '''
+  import sys
   import threading
   import Queue
 
+  class _Error(object):
+    def __init__(self,exc_info):
+      self.exc_info = exc_info
+
   def sendto_queue(source,q):
     put = q.put
-    if chunksize<=1:
-      for item in source:
-        put(item)
+    try:
+      if chunksize<=1:
+        for item in source:
+          put(item)
+      else:
+        source = iter(source)
+        items  = True
+        while items:
+          items = list(islice(source, chunksize))
+          put(items)
+    except (SystemExit, KeyboardInterrupt):
+      raise
+    except:
+      put(_Error(sys.exc_info()))
     else:
-      source = iter(source)
-      items  = True
-      while items:
-        items = list(islice(source, chunksize))
-        put(items)
-
-    put(StopIteration)
+      put(StopIteration)
 
   def genfrom_queue(q):
     _StopIteration = StopIteration
@@ -935,12 +955,16 @@ def generator_thread(source, maxsize=1000, chunksize=1000):
         item = get()
         if item is _StopIteration:
           break
+        if isinstance(item,_Error):
+          raise item.exc_info[0],item.exc_info[1],item.exc_info[2]
         yield item
     else:
       while True:
         items = get()
         if items is _StopIteration:
           break
+        if isinstance(items,_Error):
+          raise items.exc_info[0],items.exc_info[1],items.exc_info[2]
         for item in items:
           yield item
 
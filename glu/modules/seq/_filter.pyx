@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import division
+
+__abstract__  = 'Compiled alignment filtering loops for glu.modules.seq.filter'
+__copyright__ = 'Copyright (c) 2010, BioInformed LLC and the U.S. Department of Health & Human Services. Funded by NCI under Contract N01-CO-12400.'
+__license__   = 'See GLU license for terms by running: glu license'
+__revision__  = '$Id$'
+
+
+import sys
+
+import numpy as np
+
+from   libc.stdint               cimport uint16_t, uint32_t, int64_t
+from   libc.limits               cimport INT_MAX
+
+from   pysam.libchtslib          cimport bam1_t, bam_get_cigar, bam_cigar_op, bam_cigar_oplen, \
+                                         bam_cigar_type, BAM_FUNMAP, BAM_FQCFAIL
+from   pysam.libcalignedsegment  cimport AlignedSegment
+from   pysam.libcalignmentfile   cimport AlignmentFile
+
+
+# Must match the status codes in glu.modules.seq.filter
+cdef enum:
+  ONTARGET, OFFTARGET, UNALIGNED, TOOSHORT, CONTROL, STATUS_COUNT
+
+
+cdef inline int align_end(bam1_t *b):
+  '''
+  Return the reference end of an alignment as computed by pysam's aend, or
+  -1 for unmapped alignments and those without a CIGAR string, where aend
+  is None.  Only the C struct is consulted, avoiding a property lookup and
+  the creation of an integer object.
+  '''
+  cdef uint32_t *cigar
+  cdef uint32_t  i, n = b.core.n_cigar
+  cdef int       end  = b.core.pos
+
+  if (b.core.flag & BAM_FUNMAP) or not n:
+    return -1
+
+  cigar = bam_get_cigar(b)
+  for i in range(n):
+    # Operations that consume reference bases (M, D, N, = and X)
+    if bam_cigar_type(bam_cigar_op(cigar[i]))&2:
+      end += bam_cigar_oplen(cigar[i])
+
+  return end
+
+
+def simple_filter(aligns,controls,stats,options):
+  cdef AlignedSegment align
+  cdef bam1_t   *b
+  cdef int       tid, cur_tid = -2, mode = ONTARGET, status, rlen
+  cdef int       minreadlen = options.minreadlen
+  cdef bint      drop = options.action not in ('keep','fail')
+  cdef uint16_t  mark = BAM_FQCFAIL if options.action=='fail' else 0
+  cdef long long reads[STATUS_COUNT]
+  cdef long long bases[STATUS_COUNT]
+
+  cdef int64_t[:, ::1] lengths = stats.lengths
+
+  for status in range(STATUS_COUNT):
+    reads[status] = bases[status] = 0
+
+  try:
+    for align in aligns:
+      b   = align._delegate
+      tid = b.core.tid
+
+      # Alignments arrive grouped by contig, so the contig-level status is
+      # only re-evaluated at each transition
+      if tid!=cur_tid:
+        cur_tid = tid
+
+        if tid<0:
+          mode = UNALIGNED
+        elif tid in controls:
+          mode = CONTROL
+        else:
+          mode = ONTARGET
+
+      rlen   = b.core.l_qseq
+      status = mode
+
+      if status==ONTARGET and rlen<minreadlen:
+        status = TOOSHORT
+
+      reads[status]        += 1
+      bases[status]        += rlen
+      lengths[status,rlen] += 1
+
+      # Failing alignments are dropped, or kept with mark OR'd into their
+      # flags, which is BAM_FQCFAIL when failing and zero when keeping
+      if status!=ONTARGET:
+        if drop:
+          continue
+        b.core.flag |= mark
+
+      yield align
+
+  finally:
+    for status in range(STATUS_COUNT):
+      stats.reads[status] += reads[status]
+      stats.bases[status] += bases[status]
+
+
+def target_filter(aligns,references,targets,controls,stats,options):
+  cdef AlignedSegment align
+  cdef bam1_t   *b
+  cdef int       tid, cur_tid = -2, mode = ONTARGET, status, rlen
+  cdef int       minreadlen = options.minreadlen
+  cdef int       align_start, align_stop, target_start, target_end
+  cdef int       next_start = INT_MAX, next_end = INT_MAX
+  cdef Py_ssize_t  i, j, n = 0
+  cdef int[::1]    starts, ends
+  cdef long      overlap_len, minoverlap = options.minoverlap
+  cdef bint      drop = options.action not in ('keep','fail')
+  cdef uint16_t  mark = BAM_FQCFAIL if options.action=='fail' else 0
+  cdef long long reads[STATUS_COUNT]
+  cdef long long bases[STATUS_COUNT]
+
+  cdef int64_t[:, ::1] lengths = stats.lengths
+
+  for status in range(STATUS_COUNT):
+    reads[status] = bases[status] = 0
+
+  contigs  = set()
+
+  try:
+    for align in aligns:
+      b   = align._delegate
+      tid = b.core.tid
+
+      # Alignments arrive grouped by contig, so targets are only loaded at
+      # each transition
+      if tid!=cur_tid:
+        cur_tid = tid
+        rname   = references[tid] if tid>=0 else 'unaligned'
+
+        ctargets = targets.get(rname,[])
+
+        print >> sys.stderr, '[INFO] Processing contig=%s targets=%d' % (rname,len(ctargets))
+
+        assert rname not in contigs, 'Duplicate contig %s seen' % rname
+        contigs.add(rname)
+
+        if rname=='unaligned':
+          mode = UNALIGNED
+        elif tid in controls:
+          mode = CONTROL
+        else:
+          mode = ONTARGET
+
+          # Target bounds are scanned by an index i into parallel arrays,
+          # which only ever moves forward
+          starts = np.array([ t[0] for t in ctargets ], dtype=np.intc)
+          ends   = np.array([ t[1] for t in ctargets ], dtype=np.intc)
+          n      = len(ctargets)
+          i      = 0
+
+          if n:
+            next_start,next_end = starts[0],ends[0]
+          else:
+            next_start = next_end = INT_MAX
+
+      rlen   = b.core.l_qseq
+      status = mode
+
+      # Unaligned and control reads need no further checks
+      if status!=ONTARGET:
+        pass
+
+      # Fast-path 1: fail short aligns
+      elif rlen<minreadlen:
+        status = TOOSHORT
+
+      else:
+        align_stop = align_end(b)
+
+        # Fast-path 2: No overlap with next target (if any).  Alignments
+        #              without an end (aend of None) never overlap.
+        if align_stop<0 or align_stop<next_start:
+          status = OFFTARGET
+
+        else:
+          align_start = b.core.pos
+
+          # Slow-path: Pop targets that end prior to the start of the current
+          #            alignment (see the pure-Python target_filter)
+          while i<n and next_end<align_start:
+            i += 1
+            if i<n:
+              next_start,next_end = starts[i],ends[i]
+            else:
+              next_start = next_end = INT_MAX
+
+          overlap_len = 0
+          status      = OFFTARGET
+          for j in range(i,n):
+            target_start = starts[j]
+            target_end   = ends[j]
+
+            if target_start>align_stop:
+              break
+
+            overlap_len += (target_end if target_end<align_stop else align_stop) \
+                         - (target_start if target_start>align_start else align_start)
+
+            if overlap_len>=minoverlap:
+              status = ONTARGET
+              break
+
+      reads[status]        += 1
+      bases[status]        += rlen
+      lengths[status,rlen] += 1
+
+      # Failing alignments are dropped, or kept with mark OR'd into their
+      # flags, which is BAM_FQCFAIL when failing and zero when keeping
+      if status!=ONTARGET:
+        if drop:
+          continue
+        b.core.flag |= mark
+
+      yield align
+
+  finally:
+    for status in range(STATUS_COUNT):
+      stats.reads[status] += reads[status]
+      stats.bases[status] += bases[status]
+
+
+def sink_file(AlignmentFile outbam, aligns):
+  cdef AlignedSegment align
+
+  try:
+    # Typed to call the cpdef AlignmentFile.write directly, bypassing a
+    # Python method lookup and call for each alignment
+    for align in aligns:
+      outbam.write(align)
+
+  finally:
+    outbam.close()
@@ -26,14 +26,10 @@ from   glu.lib.seqlib.filter import alignment_filter_options, filter_alignments
 
 
 def get_read_group(align):
-  tags = align.tags or []
-
-  names,values = zip(*tags)
-  idx = names.index('RG')
-  if idx>=0:
-    return values[idx]
-  else:
-    return None
+  for name,value in align.tags or []:
+    if name=='RG':
+      return value
+  return None
 
 
 def target_overlap(aligns,references,reference,targets,options):
@@ -15,6 +15,7 @@ from   collections           import deque
 from   operator              import attrgetter, itemgetter
 from   itertools             import groupby, imap, izip, count
 
+import numpy as np
 import pysam
 
 from   glu.lib.utils         import consume
@@ -59,24 +60,25 @@ def contig_stats(aligns,references,filename):
     out.writerow( [ref,n] )
 
 
-def simple_filter(aligns,controls,stats,options):
+def simple_filter_py(aligns,controls,stats,options):
   minreadlen = options.minreadlen
+  maxlen     = stats.lengths.shape[1]
 
   keep = options.action=='keep'
   fail = options.action=='fail'
 
   reads_ONTARGET   = 0
   bases_ONTARGET   = 0
-  lengs_ONTARGET   = stats.lengths[ONTARGET]
+  lengs_ONTARGET   = [0]*maxlen
   reads_UNALIGNED  = 0
   bases_UNALIGNED  = 0
-  lengs_UNALIGNED  = stats.lengths[UNALIGNED]
+  lengs_UNALIGNED  = [0]*maxlen
   reads_TOOSHORT   = 0
   bases_TOOSHORT   = 0
-  lengs_TOOSHORT   = stats.lengths[TOOSHORT]
+  lengs_TOOSHORT   = [0]*maxlen
   reads_CONTROL    = 0
   bases_CONTROL    = 0
-  lengs_CONTROL    = stats.lengths[CONTROL]
+  lengs_CONTROL    = [0]*maxlen
 
   try:
     for tid,contig_aligns in groupby(aligns, attrgetter('tid')):
@@ -139,13 +141,18 @@ def simple_filter(aligns,controls,stats,options):
     stats.bases[TOOSHORT]  += bases_TOOSHORT
     stats.reads[CONTROL]   += reads_CONTROL
     stats.bases[CONTROL]   += bases_CONTROL
+    stats.lengths[ONTARGET]  += lengs_ONTARGET
+    stats.lengths[UNALIGNED] += lengs_UNALIGNED
+    stats.lengths[TOOSHORT]  += lengs_TOOSHORT
+    stats.lengths[CONTROL]   += lengs_CONTROL
 
 
-def target_filter(aligns,references,targets,controls,stats,options):
+def target_filter_py(aligns,references,targets,controls,stats,options):
   contigs = set()
 
   minoverlap = options.minoverlap
   minreadlen = options.minreadlen
+  maxlen     = stats.lengths.shape[1]
   nulltarget = sys.maxint,sys.maxint
 
   keep = options.action=='keep'
@@ -153,19 +160,19 @@ def target_filter(aligns,references,targets,controls,stats,options):
 
   reads_ONTARGET   = 0
   bases_ONTARGET   = 0
-  lengs_ONTARGET   = stats.lengths[ONTARGET]
+  lengs_ONTARGET   = [0]*maxlen
   reads_OFFTARGET  = 0
   bases_OFFTARGET  = 0
-  lengs_OFFTARGET  = stats.lengths[OFFTARGET]
+  lengs_OFFTARGET  = [0]*maxlen
   reads_UNALIGNED  = 0
   bases_UNALIGNED  = 0
-  lengs_UNALIGNED  = stats.lengths[UNALIGNED]
+  lengs_UNALIGNED  = [0]*maxlen
   reads_TOOSHORT   = 0
   bases_TOOSHORT   = 0
-  lengs_TOOSHORT   = stats.lengths[TOOSHORT]
+  lengs_TOOSHORT   = [0]*maxlen
   reads_CONTROL    = 0
   bases_CONTROL    = 0
-  lengs_CONTROL    = stats.lengths[CONTROL]
+  lengs_CONTROL    = [0]*maxlen
 
   try:
     for tid,contig_aligns in groupby(aligns, attrgetter('tid')):
@@ -262,6 +269,7 @@ def target_filter(aligns,references,targets,controls,stats,options):
         #      non-negative, and add it to the total overlap count.
 
         overlap_len = 0
+        ontarget    = False
         for target_start,target_end,target_name in ctargets:
           if target_start>align_end:
             break
@@ -270,13 +278,16 @@ def target_filter(aligns,references,targets,controls,stats,options):
 
           # Determine if the degree of overlap is sufficient
           if overlap_len>=minoverlap:
-            reads_ONTARGET       += 1
-            bases_ONTARGET       += rlen
-            lengs_ONTARGET[rlen] += 1
-
-            yield align
+            ontarget = True
             break
 
+        if ontarget:
+          reads_ONTARGET       += 1
+          bases_ONTARGET       += rlen
+          lengs_ONTARGET[rlen] += 1
+
+          yield align
+
         else:
           reads_OFFTARGET       += 1
           bases_OFFTARGET       += rlen
@@ -299,6 +310,11 @@ def target_filter(aligns,references,targets,controls,stats,options):
     stats.bases[TOOSHORT]  += bases_TOOSHORT
     stats.reads[CONTROL]   += reads_CONTROL
     stats.bases[CONTROL]   += bases_CONTROL
+    stats.lengths[ONTARGET]  += lengs_ONTARGET
+    stats.lengths[OFFTARGET] += lengs_OFFTARGET
+    stats.lengths[UNALIGNED] += lengs_UNALIGNED
+    stats.lengths[TOOSHORT]  += lengs_TOOSHORT
+    stats.lengths[CONTROL]   += lengs_CONTROL
 
 
 # UNUSED: This is a sanity-check implementation that uses an IntervalTree
@@ -307,86 +323,105 @@ def target_filter(aligns,references,targets,controls,stats,options):
 def target_filter_generic(aligns,references,targets,stats,options):
   from   glu.lib.seqlib.intervaltree  import IntervalTree
 
-  contigs = set()
+  contigs    = set()
   minoverlap = options.minoverlap
+  minreadlen = options.minreadlen
 
   fail  = options.action=='fail'
   keep  = options.action=='keep'
-  reads = stats.reads
-  bases = stats.bases
 
-  for tid,contig_aligns in groupby(aligns, attrgetter('tid')):
-    rname = references[tid] if tid>=0 else 'unaligned'
+  reads_ONTARGET   = 0
+  bases_ONTARGET   = 0
+  reads_OFFTARGET  = 0
+  bases_OFFTARGET  = 0
+  reads_UNALIGNED  = 0
+  bases_UNALIGNED  = 0
+  reads_TOOSHORT   = 0
+  bases_TOOSHORT   = 0
 
-    contig_targets = targets.get(rname,[])
+  try:
+    for tid,contig_aligns in groupby(aligns, attrgetter('tid')):
+      rname = references[tid] if tid>=0 else 'unaligned'
 
-    targettree = IntervalTree()
-    for target_start,target_end,target_name in contig_targets:
-      targettree.insert(target_start,target_end)
+      contig_targets = targets.get(rname,[])
 
-    print >> sys.stderr, '[INFO] Processing contig=%s targets=%d' % (rname,len(contig_targets))
+      targettree = IntervalTree()
+      for target_start,target_end,target_name in contig_targets:
+        targettree.insert(target_start,target_end)
 
-    assert rname not in contigs, 'Duplicate contig %s seen' % rname
-    contigs.add(rname)
+      print >> sys.stderr, '[INFO] Processing contig=%s targets=%d' % (rname,len(contig_targets))
 
-    if rname=='unaligned':
-      for align in contig_aligns:
-        reads[UNALIGNED] += 1
-        bases[UNALIGNED] += align.rlen
+      assert rname not in contigs, 'Duplicate contig %s seen' % rname
+      contigs.add(rname)
 
-        if keep:
-          yield align
-        elif fail:
-          align.is_qcfail = True
-          yield align
+      if rname=='unaligned':
+        for align in contig_aligns:
+          reads_UNALIGNED += 1
+          bases_UNALIGNED += align.rlen
+
+          if keep:
+            yield align
+          elif fail:
+            align.is_qcfail = True
+            yield align
 
-      continue
+        continue
 
-    for align in contig_aligns:
-      rlen = align.rlen
+      for align in contig_aligns:
+        rlen = align.rlen
 
-      if rlen<options.minreadlen:
-        reads[TOOSHORT] += 1
-        bases[TOOSHORT] += rlen
+        if rlen<minreadlen:
+          reads_TOOSHORT += 1
+          bases_TOOSHORT += rlen
 
-        if keep:
-          yield align
-        elif fail:
-          align.is_qcfail = True
-          yield align
+          if keep:
+            yield align
+          elif fail:
+            align.is_qcfail = True
+            yield align
 
-        continue
+          continue
 
-      align_start = align.pos
-      align_end   = align.aend
+        align_start = align.pos
+        align_end   = align.aend
 
-      overlap_len = 0
-      for target in targettree.find(align_start, align_end):
-        overlap_len += min(target.end,align_end)-max(target.start,align_start)
+        overlap_len = 0
+        for target in targettree.find(align_start, align_end):
+          overlap_len += min(target.end,align_end)-max(target.start,align_start)
 
-      if overlap_len<minoverlap:
-        reads[OFFTARGET] += 1
-        bases[OFFTARGET] += rlen
+        if overlap_len<minoverlap:
+          reads_OFFTARGET += 1
+          bases_OFFTARGET += rlen
 
-        if keep:
-          yield align
-        elif fail:
-          align.is_qcfail = True
+          if keep:
+            yield align
+          elif fail:
+            align.is_qcfail = True
+            yield align
+        else:
+          reads_ONTARGET += 1
+          bases_ONTARGET += rlen
           yield align
-      else:
-        reads[ONTARGET] += 1
-        bases[ONTARGET] += rlen
-        yield align
+
+  finally:
+    stats.reads[ONTARGET]  += reads_ONTARGET
+    stats.bases[ONTARGET]  += bases_ONTARGET
+    stats.reads[OFFTARGET] += reads_OFFTARGET
+    stats.bases[OFFTARGET] += bases_OFFTARGET
+    stats.reads[UNALIGNED] += reads_UNALIGNED
+    stats.bases[UNALIGNED] += bases_UNALIGNED
+    stats.reads[TOOSHORT]  += reads_TOOSHORT
+    stats.bases[TOOSHORT]  += bases_TOOSHORT
 
 
 class FilterStats(object):
   def __init__(self):
-    self.reads   = [0]*STATUS_COUNT
-    self.bases   = [0]*STATUS_COUNT
-    self.lengths = [ [0]*10000 for i in range(STATUS_COUNT) ]
+    self.reads   = np.zeros(STATUS_COUNT, dtype=np.int64)
+    self.bases   = np.zeros(STATUS_COUNT, dtype=np.int64)
+    self.lengths = np.zeros( (STATUS_COUNT,10000), dtype=np.int64 )
 
 
-def sink_file(outbam,aligns):
+def sink_file_py(outbam,aligns):
   try:
     for align in aligns:
       outbam.write(align)
@@ -399,6 +434,16 @@ def sink_null(aligns):
   consume(aligns)
 
 
+# Try to import the compiled versions, which read alignment fields directly
+# from the underlying htslib records
+try:
+  from glu.modules.seq._filter import simple_filter, target_filter, sink_file
+except ImportError:
+  simple_filter = simple_filter_py
+  target_filter = target_filter_py
+  sink_file     = sink_file_py
+
+
 def percent(a,b):
   return a/b*100 if b else 0
 
@@ -511,7 +556,7 @@ def option_parser():
                     help='Minimum read length filter')
   parser.add_argument('--targets', metavar='BED',
                     help='Single track BED file containing all targeted intervals')
-  parser.add_argument('--padtargets', metavar='N', default=0,
+  parser.add_argument('--padtargets', metavar='N', type=int, default=0,
                     help='Pad each target with N base pairs up- and down-stream (default=0)')
   parser.add_argument('--controls', metavar='CONTIGS',
                     help='List of control contigs to allow those aligned '
@@ -531,6 +576,8 @@ def option_parser():
 
   parser.add_argument('-o', '--output', metavar='FILE',
                     help='Output BAM file')
+  parser.add_argument('--threads', metavar='N', type=int, default=1,
+                    help='Number of threads for BAM compression and decompression (default=1)')
   parser.add_argument('-O', '--sumout', metavar='FILE', default='-',
                     help='Summary output file')
   parser.add_argument('--contigstats', metavar='FILE',
@@ -550,17 +597,20 @@ def main():
   if options.action not in ('drop','fail','keep'):
     raise ValueError('Invalid filter action selected')
 
+  # Only pass threads when requested, since older pysam versions lack it
+  samargs = {'threads':options.threads} if options.threads>1 else {}
+
   samfiles = []
   for filename in options.bamfile:
     flags   = 'rb' if filename.endswith('.bam') else 'r'
-    samfiles.append(pysam.Samfile(filename, flags))
+    samfiles.append(pysam.Samfile(filename, flags, **samargs))
 
   if len(samfiles)==1:
     samfile    = samfiles[0]
     header     = samfile.header
     references = samfile.references
     lengths    = samfile.lengths
-    aligns     = iter(samfile)
+    aligns     = samfile.fetch(until_eof=True)
 
   elif 0: # Merging functionality is now part of our internal pysam tree
     samfiles,header,references,lengths,aligns = merge_bams(samfiles)
@@ -609,7 +659,8 @@ def main():
 
       outbam = pysam.Samfile(options.output, flags, header=header,
                                                     referencenames=references,
-                                                    referencelengths=lengths)
+                                                    referencelengths=lengths,
+                                                    **samargs)
 
       sink_file(outbam,aligns)
     else:
@@ -628,8 +679,8 @@ def main():
   reads   = stats.reads
   lengths = stats.lengths
 
-  total_reads = sum(reads)
-  total_bases = sum(bases)
+  total_reads = int(reads.sum())
+  total_bases = int(bases.sum())
 
   sumout = autofile(hyphen(options.sumout, sys.stderr),'w')
 
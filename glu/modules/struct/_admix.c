@@ -233,53 +233,20 @@ admixture_log_likelihood(PyObject *self, PyObject *args)
 }
 
 
-PyObject *
-admixture_log_likelihood_derivative(PyObject *self, PyObject *args)
+/* Accumulate the derivative of the admixture log likelihood into d, which must be
+ * initialized to zero by the caller.
+ *
+ * The following code is also manually unrolled for various common values of k.  This
+ * results in > 2x speedups by avoiding several loops, or else it wouldn't be worth the
+ * bother.
+ */
+static void
+accumulate_derivative(const double *f, const double *x, double *d, Py_ssize_t n, Py_ssize_t k)
 {
-	PyObject *frequencies, *mixture, *derivative;
-	double *f, *x, *d;
-	Py_ssize_t n, k, m, i, j;
-
-	if(!PyArg_ParseTuple(args, "OO", &frequencies, &mixture))
-		return NULL;
-
-	if(!Array_CheckTypeDouble(frequencies) || PyArray_NDIM(frequencies)!=2)
-	{
-		PyErr_SetString(PyExc_TypeError, "frequencies must be a 2d float ndarray");
-		return NULL;
-	}
-
-	if(!Array_CheckTypeDouble(mixture) || PyArray_NDIM(mixture)!=1)
-	{
-		PyErr_SetString(PyExc_TypeError, "mixture parameters must be a 1d float ndarray");
-		return NULL;
-	}
-
-	n = PyArray_DIMS(frequencies)[0];
-	k = PyArray_DIMS(frequencies)[1];
-	m = PyArray_DIMS(mixture)[0];
-
-	if(m != k)
-	{
-		PyErr_Format(PyExc_ValueError, "unexpected number of mixture parameters %zd.  Expected %zd",
-		                                m, k);
-		return NULL;
-	}
-
-	derivative = PyArray_ZEROS(1, &k, NPY_DOUBLE, 0);
-	if(!derivative) return NULL;
-
-	f = (double *)PyArray_DATA(frequencies);
+	Py_ssize_t i, j;
 
-	/* The following code is also manually unrolled for various common values of k.  This
-	 * results in > 2x speedups by avoiding several loops, or else it wouldn't be worth the
-	 * bother.
-	 */
 	if(k==2)
 	{
-		x = (double *)PyArray_DATA(mixture);
-		d = (double *)PyArray_DATA(derivative);
-
 		for(i=0; i<n; ++i,f+=k)
 		{
 			/* Pass 1: Compute denominator */
@@ -292,9 +259,6 @@ admixture_log_likelihood_derivative(PyObject *self, PyObject *args)
 	}
 	else if(k==3)
 	{
-		x = (double *)PyArray_DATA(mixture);
-		d = (double *)PyArray_DATA(derivative);
-
 		for(i=0; i<n; ++i,f+=k)
 		{
 			/* Pass 1: Compute denominator */
@@ -308,9 +272,6 @@ admixture_log_likelihood_derivative(PyObject *self, PyObject *args)
 	}
 	else if(k==4)
 	{
-		x = (double *)PyArray_DATA(mixture);
-		d = (double *)PyArray_DATA(derivative);
-
 		for(i=0; i<n; ++i,f+=k)
 		{
 			/* Pass 1: Compute denominator */
@@ -325,9 +286,6 @@ admixture_log_likelihood_derivative(PyObject *self, PyObject *args)
 	}
 	else if(k==5)
 	{
-		x = (double *)PyArray_DATA(mixture);
-		d = (double *)PyArray_DATA(derivative);
-
 		for(i=0; i<n; ++i,f+=k)
 		{
 			/* Pass 1: Compute denominator */
@@ -343,9 +301,6 @@ admixture_log_likelihood_derivative(PyObject *self, PyObject *args)
 	}
 	else if(k==6)
 	{
-		x = (double *)PyArray_DATA(mixture);
-		d = (double *)PyArray_DATA(derivative);
-
 		for(i=0; i<n; ++i,f+=k)
 		{
 			/* Pass 1: Compute denominator */
@@ -363,27 +318,153 @@ admixture_log_likelihood_derivative(PyObject *self, PyObject *args)
 	}
 	else
 	{
-		for(i=0; i<n; ++i)
+		for(i=0; i<n; ++i,f+=k)
 		{
-			double  u  = 0;
-			double *ff = f;
+			double u = 0;
 
 			/* Pass 1: Compute denominator */
-			x = (double *)PyArray_DATA(mixture);
-			for(j=0; j<k; ++j,++f,++x)
-				u += (*f) * (*x);
+			for(j=0; j<k; ++j)
+				u += f[j]*x[j];
 
 			/* Pass 2: Accumulate derivative */
-			d = (double *)PyArray_DATA(derivative);
 			u = 1/u;
-			for(j=0,f=ff; j<k; ++j,++f,++d)
-				*d += (*f)*u;
+			for(j=0; j<k; ++j)
+				d[j] += f[j]*u;
 		}
 	}
+}
+
+
+PyObject *
+admixture_log_likelihood_derivative(PyObject *self, PyObject *args)
+{
+	PyObject *frequencies, *mixture, *derivative;
+	Py_ssize_t n, k, m;
+
+	if(!PyArg_ParseTuple(args, "OO", &frequencies, &mixture))
+		return NULL;
+
+	if(!Array_CheckTypeDouble(frequencies) || PyArray_NDIM(frequencies)!=2)
+	{
+		PyErr_SetString(PyExc_TypeError, "frequencies must be a 2d float ndarray");
+		return NULL;
+	}
+
+	if(!Array_CheckTypeDouble(mixture) || PyArray_NDIM(mixture)!=1)
+	{
+		PyErr_SetString(PyExc_TypeError, "mixture parameters must be a 1d float ndarray");
+		return NULL;
+	}
+
+	n = PyArray_DIMS(frequencies)[0];
+	k = PyArray_DIMS(frequencies)[1];
+	m = PyArray_DIMS(mixture)[0];
+
+	if(m != k)
+	{
+		PyErr_Format(PyExc_ValueError, "unexpected number of mixture parameters %zd.  Expected %zd",
+		                                m, k);
+		return NULL;
+	}
+
+	derivative = PyArray_ZEROS(1, &k, NPY_DOUBLE, 0);
+	if(!derivative) return NULL;
+
+	accumulate_derivative((double *)PyArray_DATA(frequencies), (double *)PyArray_DATA(mixture),
+	                      (double *)PyArray_DATA(derivative), n, k);
+
 	return derivative;
 }
 
 
+PyObject *
+admixture_em(PyObject *self, PyObject *args)
+{
+	PyObject *frequencies, *mixture, *result;
+	double *f, *x, *d;
+	double gamma = 1, total;
+	Py_ssize_t n, k, m, i, j;
+	int iters;
+
+	if(!PyArg_ParseTuple(args, "OOi|d", &frequencies, &mixture, &iters, &gamma))
+		return NULL;
+
+	if(!Array_CheckTypeDouble(frequencies) || PyArray_NDIM(frequencies)!=2)
+	{
+		PyErr_SetString(PyExc_TypeError, "frequencies must be a 2d float ndarray");
+		return NULL;
+	}
+
+	if(!Array_CheckTypeDouble(mixture) || PyArray_NDIM(mixture)!=1)
+	{
+		PyErr_SetString(PyExc_TypeError, "mixture parameters must be a 1d float ndarray");
+		return NULL;
+	}
+
+	n = PyArray_DIMS(frequencies)[0];
+	k = PyArray_DIMS(frequencies)[1];
+	m = PyArray_DIMS(mixture)[0];
+
+	if(m != k)
+	{
+		PyErr_Format(PyExc_ValueError, "unexpected number of mixture parameters %zd.  Expected %zd",
+		                                m, k);
+		return NULL;
+	}
+
+	/* Iterate on a copy, so the initial mixture parameters are not modified */
+	result = PyArray_NewCopy((PyArrayObject *)mixture, NPY_CORDER);
+	if(!result) return NULL;
+
+	d = (double *)PyMem_Malloc(k*sizeof(double));
+	if(!d)
+	{
+		Py_DECREF(result);
+		return PyErr_NoMemory();
+	}
+
+	f = (double *)PyArray_DATA(frequencies);
+	x = (double *)PyArray_DATA(result);
+
+	/* Each EM update scales the mixture parameters by the derivative of the log
+	 * likelihood divided by the number of loci.  All iterations are performed here
+	 * to avoid allocating a new derivative array and a round-trip through Python for
+	 * each of them.
+	 */
+	for(i=0; i<iters; ++i)
+	{
+		for(j=0; j<k; ++j)
+			d[j] = 0;
+
+		accumulate_derivative(f, x, d, n, k);
+
+		if(gamma==1)
+		{
+			for(j=0; j<k; ++j)
+				x[j] *= d[j]/n;
+			continue;
+		}
+
+		/* Over-relaxed step x + gamma*(x_em - x), kept strictly positive and
+		 * renormalized to sum to one
+		 */
+		for(j=0, total=0; j<k; ++j)
+		{
+			x[j] += gamma*(x[j]*d[j]/n - x[j]);
+			if(x[j] < DBL_EPSILON)
+				x[j] = DBL_EPSILON;
+			total += x[j];
+		}
+
+		for(j=0; j<k; ++j)
+			x[j] /= total;
+	}
+
+	PyMem_Free(d);
+	return result;
+}
+
+
 PyObject *
 individual_frequencies(PyObject *self, PyObject *args)
 {
@@ -466,6 +547,8 @@ init_admix(void)
 		 "Compute admixture likelihood for given population frequencies and admixture estimates"},
 		{"admixture_log_likelihood_derivative", (PyCFunction)admixture_log_likelihood_derivative, METH_VARARGS,
 		 "Compute the derivative of the admixture likelihood for given population frequencies and admixture estimates"},
+		{"admixture_em", (PyCFunction)admixture_em, METH_VARARGS,
+		 "Perform a fixed number of (optionally over-relaxed) EM iterations to estimate admixture from given population frequencies and initial estimates"},
 		{"individual_frequencies", (PyCFunction)individual_frequencies, METH_VARARGS,
 		 "Select population frequencies for a given individual's genotype indices"},
 	       {NULL}  /* Sentinel */
@@ -9,11 +9,12 @@ __license__   = 'See GLU license for terms by running: glu license'
 __revision__  = '$Id$'
 
 
+import signal
 import sys
 
 import numpy as np
 
-from   itertools                 import izip
+from   itertools                 import izip, islice
 
 from   glu.lib.fileutils         import table_writer, table_reader
 from   glu.lib.progressbar       import progress_loop
@@ -56,25 +57,71 @@ def admixture_log_likelihood_derivative_python(f,x):
   >>> np.allclose(d, [ 4.80952381,  4.78571429,  5.61904762])
   True
   '''
-  return (f/np.dot(f,x)[:,np.newaxis]).sum(axis=0)
+  # sum(f[i,j]/u[i]) over i, computed as the product of 1/u by f to avoid
+  # creating an (n,k) temporary
+  return np.dot(1/np.dot(f,x),f)
 
 
 def individual_frequencies_python(populations,ind):
-  mask    = ind>0
-  indices = np.where(mask)[0]
-  ind     = ind[mask]
-  f       = populations[:,indices,ind].T
-  return f
+  '''
+  >>> pops = np.arange(24,dtype=float).reshape(2,3,4)
+  >>> individual_frequencies_python(pops,[2,0,3]).tolist()
+  [[2.0, 14.0], [11.0, 23.0]]
+  '''
+  # Genotype indices may be a list when the pure-Python genoarray is used
+  ind     = np.asarray(ind, dtype=np.intp)
+  indices = np.flatnonzero(ind)
+
+  # Gather all populations at once, in row-major order like the C version
+  return np.ascontiguousarray(populations[:,indices,ind[indices]].T)
+
+
+def admixture_em_python(f,x0,iters,gamma=1):
+  '''
+  >>> f = np.array([[0.25, 0.50, 0.25],
+  ...               [0.50, 0.25, 1.00],
+  ...               [0.50, 1.00, 1.00],
+  ...               [0.25, 0.50, 0.50],
+  ...               [0.75, 0.25, 0.25]])
+  >>> x0 = np.array([0.25, 0.50, 0.25])
+
+  >>> x=admixture_em_python(f,x0,10)
+  >>> np.allclose(x, [ 0.16746496,  0.3240192 ,  0.50851583])
+  True
+  >>> np.allclose(x0, [0.25, 0.50, 0.25])
+  True
+
+  >>> x=admixture_em_python(f,x0,10,1.5)
+  >>> np.allclose(x, [ 0.14365414,  0.26998143,  0.58636443])
+  True
+  '''
+  n = len(f)
+
+  # Copy, since iterations update x in place
+  x = np.array(x0, dtype=float)
+
+  for i in xrange(iters):
+    if gamma==1:
+      x *= admixture_log_likelihood_derivative(f,x)/n
+    else:
+      # Over-relaxed step, kept strictly positive and renormalized
+      x += gamma*(x*admixture_log_likelihood_derivative(f,x)/n - x)
+      np.clip(x,EPSILON,np.inf,out=x)
+      x /= x.sum()
+
+  return x
 
 
 try:
   from glu.modules.struct._admix import individual_frequencies as individual_frequencies_c, \
                                         admixture_log_likelihood as admixture_log_likelihood_c, \
-                                        admixture_log_likelihood_derivative as admixture_log_likelihood_derivative_c
+                                        admixture_log_likelihood_derivative as admixture_log_likelihood_derivative_c, \
+                                        admixture_em as admixture_em_c
 
   individual_frequencies = individual_frequencies_c
   admixture_log_likelihood = admixture_log_likelihood_c
   admixture_log_likelihood_derivative = admixture_log_likelihood_derivative_c
+  admixture_em = admixture_em_c
 
   def test_admixture_log_likelihood():
     '''
@@ -91,15 +138,56 @@ try:
     >>> d=admixture_log_likelihood_derivative_c(f,x)
     >>> np.allclose(d, [ 4.80952381,  4.78571429,  5.61904762])
     True
+
+    >>> np.allclose(admixture_em_c(f,x,10), admixture_em_python(f,x,10))
+    True
+    >>> np.allclose(admixture_em_c(f,x,10,1.5), admixture_em_python(f,x,10,1.5))
+    True
+    >>> np.allclose(x, [0.25, 0.50, 0.25])
+    True
     '''
 
 except ImportError:
   individual_frequencies = individual_frequencies_python
   admixture_log_likelihood = admixture_log_likelihood_python
   admixture_log_likelihood_derivative = admixture_log_likelihood_derivative_python
+  admixture_em = admixture_em_python
 
 
-def estimate_admixture_em(f,x0=None,iters=100):
+def simplex_projection(v):
+  '''
+  Return the Euclidean projection of v onto the probability simplex
+  {x : x>=0, sum(x)==1}, i.e., the nearest vector of valid mixing
+  proportions, by the sort-based algorithm of Michelot (1986).
+
+  >>> simplex_projection(np.array([0.5, 0.5]))
+  array([0.5, 0.5])
+  >>> simplex_projection(np.array([1.2, -0.1, 0.1]))
+  array([1., 0., 0.])
+  >>> x = simplex_projection(np.array([0.8, 0.3, 0.2]))
+  >>> np.allclose(x, [0.7, 0.2, 0.1])
+  True
+
+  Vectors with non-finite values have no projection and are only clipped to
+  [0,1], leaving any NaNs in place:
+
+  >>> simplex_projection(np.array([np.nan, 0.5, 1.5])).tolist()
+  [nan, 0.5, 1.0]
+  '''
+  v     = np.asarray(v, dtype=float).reshape(-1)
+
+  if not np.isfinite(v).all():
+    return np.clip(v,0,1)
+
+  u     = np.sort(v)[::-1]
+  cssv  = np.cumsum(u)-1
+  ind   = np.arange(1,len(v)+1)
+  rho   = np.flatnonzero(u-cssv/ind > 0)[-1]
+  theta = cssv[rho]/(rho+1)
+  return np.maximum(v-theta,0)
+
+
+def estimate_admixture_em(f,x0=None,iters=100,gamma=1):
   '''
   Problem: Maximize a likelihood to determine mixing proportions a series of
   events from a series of k Bernoulli distributions (a simplification of a
@@ -123,17 +211,38 @@ def estimate_admixture_em(f,x0=None,iters=100):
   iterate a fixed number of times and do not bother checking for
   convergence.  Those estimates can then be used as a feasible starting
   point for algorithms with better local convergence properties.
-  '''
-  n,k = f.shape
 
+  To speed things along, each step may be over-relaxed by a factor gamma>1,
+  x + gamma*(x_em - x), the parameterized EM of Peters and Walker.  The
+  likelihood is checked every few steps and, should it decrease, gamma is
+  halved and those steps are repeated.  The default gamma of 1 gives
+  classical EM.  Over-relaxed estimates differ from classical ones, and so
+  may alter the solutions found by other algorithms started from them.
+  '''
   if x0 is None:
-    x = np.ones(k)/k
+    k  = f.shape[1]
+    x0 = np.ones(k)/k
   else:
-    # Ensure we copy, since iterations update x in place
-    x = np.array(x0)
+    x0 = np.ascontiguousarray(x0, dtype=float)
 
-  for i in xrange(iters):
-    x *= admixture_log_likelihood_derivative(f,x)/n
+  if gamma==1:
+    return admixture_em(f,x0,iters)
+
+  # Copy, so the initial estimates are never returned
+  x = np.array(x0)
+  l = admixture_log_likelihood(f,x)
+
+  while iters>0:
+    steps = min(iters,5)
+    x1    = admixture_em(f,x,steps,gamma)
+    l1    = admixture_log_likelihood(f,x1)
+
+    if l1<l and gamma>1:
+      gamma = max(1,gamma/2)
+      continue
+
+    x,l    = x1,l1
+    iters -= steps
 
   return x
 
@@ -173,9 +282,10 @@ def estimate_admixture_cvxopt(f, x0, maxiters=25, failover=True):
   n,k = f.shape
   x0  = matrix(x0)
 
-  # Precompute cross-products of population frequencies (columns of f) for the Hessian
-  ff = [ [ (f[:,i]*f[:,j])[:,np.newaxis] if i>=j else 0 for j in range(k) ]
-                                                        for i in range(k) ]
+  # Precompute cross-products of population frequencies (columns of f) for
+  # the lower triangle of the Hessian, packed as rows of a single array
+  lower = np.tril_indices(k)
+  ff    = f[:,lower[0]].T*f[:,lower[1]].T
 
   # Store last function values, since the solver seems to want to
   # re-evaluate them several times
@@ -191,10 +301,9 @@ def estimate_admixture_cvxopt(f, x0, maxiters=25, failover=True):
     # Do not check constraints or else optimization will often get "stuck"
     x = np.asarray(x, dtype=float).reshape(-1)
 
-    # Check to see if we've just solved this case
+    # Check to see if we've just solved this case (exactly)
     if last:
-      d = (abs(x-last[0])).sum()
-      if d==0:
+      if (x==last[0]).all():
         last_x,last_z,last_l,last_df,last_h = last
         if z is None:
           return last_l,last_df
@@ -214,16 +323,17 @@ def estimate_admixture_cvxopt(f, x0, maxiters=25, failover=True):
     df = matrix(df, tc='d').T
 
     if z is None:
-      last[:] = [x+0,None,l,df,None]
+      last[:] = [x.copy(),None,l,df,None]
       return l,df
 
-    # Compute Hessian, if requested
-    u2 = (np.dot(f,x)**2)[:,np.newaxis]
-    h  = [ [ z[0]*(ff[i][j]/u2).sum() if i>=j else 0 for i in range(k) ]
-                                                     for j in range(k) ]
+    # Compute (the lower triangle of) the Hessian, if requested, with a
+    # single matrix-vector product of the cross-products and 1/u**2
+    u  = np.dot(f,x)
+    h  = np.zeros( (k,k) )
+    h[lower] = z[0]*np.dot(ff,1/(u*u))
     h  = matrix(h, tc='d')
 
-    last[:] = [x+0,z[0],l,df,h]
+    last[:] = [x.copy(),z[0],l,df,h]
     return l,df,h
 
   # Set up constraint matrices
@@ -338,7 +448,9 @@ def estimate_admixture_sqp(f, x0, failover=True):
     if fx2<fx:
       x=x2
 
-  x = np.clip(x,0,1)
+  # Map the solution, which may violate the constraints by up to the solver
+  # tolerance, to the nearest feasible point
+  x = simplex_projection(x)
   return x,fx,iters[0]
 
 
@@ -353,21 +465,31 @@ def classify_ancestry(labels,x,threshold):
   only one population group exceeds 1-threshold then the ancestry is deemed
   'ADMIXED' for that population.  Otherwise, a list of populations with
   estimated admixture above 1-threshold is returned.
+
+  >>> labels = ['CEU','YRI','ASN']
+  >>> classify_ancestry(labels,[0.85,0.10,0.05],0.80)
+  'CEU'
+  >>> classify_ancestry(labels,[0.70,0.15,0.15],0.80)
+  'ADMIXED CEU'
+  >>> classify_ancestry(labels,[0.30,0.30,0.40],0.80)
+  'ASN,CEU,YRI'
   '''
-  popset = set()
+  # Labels are unique (see build_labels), so a list suffices to collect them
+  lower = 1-threshold
+  pops  = []
+  cmax  = -1
 
-  cmax = -1
   for pop,coeff in izip(labels,x):
-    if coeff >= 1-threshold:
-      popset.add(pop)
-      cmax = max(cmax,coeff)
+    if coeff >= lower:
+      pops.append(pop)
+      if coeff > cmax:
+        cmax = coeff
 
-  if len(popset)==1 and cmax < threshold:
-    ipop = 'ADMIXED %s' % popset.pop()
-  else:
-    ipop = ','.join(sorted(popset))
+  if len(pops)==1 and cmax < threshold:
+    return 'ADMIXED %s' % pops[0]
 
-  return ipop
+  pops.sort()
+  return ','.join(pops)
 
 
 def compute_frequencies(freq_model,sample_count,models,geno_counts):
@@ -591,12 +713,88 @@ def option_parser():
                     help='Imputed ancestry threshold (default=0.80)')
   parser.add_argument('-o', '--output', metavar='FILE', default='-',
                     help='output table file name')
+  parser.add_argument('--processes', metavar='N', type=int, default=1,
+                    help='Number of worker processes used to estimate admixture (default=1)')
   parser.add_argument('-P', '--progress', action='store_true',
                     help='Show analysis progress bar, if possible')
 
   return parser
 
 
+def estimate_sample(pops,labels,threshold,inds):
+  '''
+  Estimate admixture proportions and impute ancestry for a single individual
+  given their genotype indices, returning the rendered output columns
+  '''
+  # Compute genotype frequencies
+  f      = individual_frequencies(pops,inds)
+
+  # Find feasible starting values
+  x0     = estimate_admixture_em(f,iters=10)
+
+  # Estimate admixture
+  x,l,it = estimate_admixture_sqp(f, x0)
+
+  ipop   = classify_ancestry(labels, x, threshold)
+
+  return ['%.4f' % a for a in x] + [ipop]
+
+
+# Arguments to estimate_sample that are shared by all samples, set once in
+# each worker process
+_worker_args = None
+
+
+def _init_worker(*args):
+  global _worker_args
+  _worker_args = args
+
+  # Leave Ctrl-C to the parent, which terminates the pool
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _estimate_sample_worker(inds):
+  return estimate_sample(*(_worker_args+(inds,)))
+
+
+def estimate_samples(test,pops,labels,threshold,processes=1,batchsize=64):
+  '''
+  Generate the sample name and output columns for each sample in test.
+  Samples are optionally estimated by a pool of worker processes, in
+  batches so that only a bounded number of samples are in flight, and
+  results are returned in the original sample order.
+  '''
+  if processes<=1:
+    for sample,genos in test:
+      yield [sample]+estimate_sample(pops,labels,threshold,genotype_indices(genos))
+    return
+
+  from multiprocessing import Pool
+
+  pool = Pool(processes, _init_worker, (pops,labels,threshold))
+
+  try:
+    test = iter(test)
+    while 1:
+      batch = list(islice(test,batchsize*processes))
+      if not batch:
+        break
+
+      samples = [ sample                 for sample,genos in batch ]
+      inds    = [ genotype_indices(genos) for sample,genos in batch ]
+      # A timeout keeps the wait interruptible by KeyboardInterrupt
+      results = pool.map_async(_estimate_sample_worker, inds).get(1<<30)
+
+      for sample,result in izip(samples,results):
+        yield [sample]+result
+
+    pool.close()
+
+  finally:
+    pool.terminate()
+    pool.join()
+
+
 def main():
   parser    = option_parser()
   options   = parser.parse_args()
@@ -614,19 +812,7 @@ def main():
   if options.progress and test.samples:
     test = progress_loop(test, length=len(test.samples), units='samples')
 
-  for sample,genos in test:
-    # Compute genotype frequencies
-    f      = individual_frequencies(pops,genotype_indices(genos))
-
-    # Find feasible starting values
-    x0     = estimate_admixture_em(f,iters=10)
-
-    # Estimate admixture
-    x,l,it = estimate_admixture_sqp(f, x0)
-
-    ipop   = classify_ancestry(labels, x, options.threshold)
-
-    out.writerow([sample]+['%.4f' % a for a in x] + [ipop])
+  out.writerows(estimate_samples(test,pops,labels,options.threshold,options.processes))
 
 
 def _test():
@@ -78,6 +78,21 @@ def glmnet_config():
   return config.add_extension('_glmnet', sources=['glu/lib/glm/glmnet.pyf','glu/lib/glm/GLMnet.f'])
 
 
+def pysam_modules(suffix):
+  '''
+  Extensions that compile against the pysam headers.  These are optional,
+  since pysam is only required for the sequence modules.
+  '''
+  try:
+    import pysam
+  except ImportError:
+    return []
+
+  return [ Extension('glu.modules.seq._filter', sources = ['glu/modules/seq/_filter.%s' % suffix],
+                                           include_dirs = pysam.get_include(),
+                                          define_macros = pysam.get_defines()) ]
+
+
 def cython_modules():
   try:
     from Cython.Build import cythonize
@@ -90,7 +105,7 @@ def cython_modules():
             Extension('glu.lib.seqlib._edits',          sources = ['glu/lib/seqlib/_edits.pyx']),
             Extension('glu.lib.seqlib.gc',              sources = ['glu/lib/seqlib/gc.pyx']),
             Extension('glu.lib.seqlib.intervaltree',    sources = ['glu/lib/seqlib/intervaltree.pyx']),
-          ]
+          ] + pysam_modules('pyx')
 
     ext = cythonize(ext)
 
@@ -104,7 +119,7 @@ def cython_modules():
             Extension('glu.lib.seqlib._edits',          sources = ['glu/lib/seqlib/_edits.c']),
             Extension('glu.lib.seqlib.gc',              sources = ['glu/lib/seqlib/gc.c']),
             Extension('glu.lib.seqlib.intervaltree',    sources = ['glu/lib/seqlib/intervaltree.c']),
-          ]
+          ] + pysam_modules('c')
 
   return ext
 